@@ -0,0 +1,204 @@
+#!/usr/bin/python
+""" Shows query plans and timings of the hot registration queries on a
+synthetic SQLite database before and after the indexes declared on the
+models are created.
+
+Usage::
+
+    python benchmarks/indexes.py [number of students]
+"""
+
+from __future__ import print_function
+
+import random
+import sqlite3
+import sys
+import time
+import uuid
+
+
+SCHEMA = (
+    'CREATE TABLE nmadb_session_reg_baseinfo ('
+    ' id integer PRIMARY KEY, first_name varchar(45),'
+    ' last_name varchar(45), email varchar(128), human_id integer,'
+    ' section_id integer, comment text, payment integer,'
+    ' generated_address varchar(255), commit_timestamp datetime)',
+    'CREATE INDEX nmadb_session_reg_baseinfo_section'
+    ' ON nmadb_session_reg_baseinfo (section_id)',
+    'CREATE TABLE nmadb_session_reg_invitation ('
+    ' id integer PRIMARY KEY, base_id integer, uuid varchar(36),'
+    ' payment integer, commit_timestamp datetime, time_sent datetime)',
+    'CREATE INDEX nmadb_session_reg_invitation_base'
+    ' ON nmadb_session_reg_invitation (base_id)',
+    'CREATE TABLE nmadb_session_reg_studentinfo ('
+    ' id integer PRIMARY KEY, invitation_id integer UNIQUE,'
+    ' first_name varchar(45), last_name varchar(45),'
+    ' email varchar(128), school_class integer)',
+    'CREATE TABLE nmadb_session_reg_parentinfo ('
+    ' id integer PRIMARY KEY, child_id integer, relation varchar(2),'
+    ' first_name varchar(45), last_name varchar(45))',
+    'CREATE INDEX nmadb_session_reg_parentinfo_child'
+    ' ON nmadb_session_reg_parentinfo (child_id)',
+    'CREATE TABLE nmadb_session_reg_sessiongroup ('
+    ' id integer PRIMARY KEY, title varchar(80) UNIQUE)',
+    'CREATE TABLE nmadb_session_reg_sessionprogramrating ('
+    ' id integer PRIMARY KEY, student_id integer, program_id integer,'
+    ' rating integer)',
+    'CREATE INDEX nmadb_session_reg_sessionprogramrating_student'
+    ' ON nmadb_session_reg_sessionprogramrating (student_id)',
+    'CREATE INDEX nmadb_session_reg_sessionprogramrating_program'
+    ' ON nmadb_session_reg_sessionprogramrating (program_id)',
+    )
+
+INDEXES = (
+    'CREATE INDEX nmadb_session_reg_invitation_uuid'
+    ' ON nmadb_session_reg_invitation (uuid)',
+    'CREATE INDEX nmadb_session_reg_baseinfo_email'
+    ' ON nmadb_session_reg_baseinfo (email)',
+    'CREATE INDEX nmadb_session_reg_baseinfo_names'
+    ' ON nmadb_session_reg_baseinfo (last_name, first_name)',
+    'CREATE INDEX nmadb_session_reg_studentinfo_names'
+    ' ON nmadb_session_reg_studentinfo (last_name, first_name)',
+    'CREATE INDEX nmadb_session_reg_parentinfo_names'
+    ' ON nmadb_session_reg_parentinfo (last_name, first_name)',
+    'CREATE INDEX nmadb_session_reg_sessionprogramrating_student_rating'
+    ' ON nmadb_session_reg_sessionprogramrating (student_id, rating)',
+    )
+
+PROGRAMS = 15
+GROUPS = 30
+REPEAT = 200
+
+
+def random_name(rng):
+    """ Generates random capitalised name.
+    """
+    return u''.join(
+            rng.choice(u'abcdeghijklmnoprstuvyz')
+            for i in range(rng.randint(4, 10))).capitalize()
+
+
+def populate(connection, students, rng):
+    """ Fills database with synthetic data and returns invitation uuids
+    and emails.
+    """
+    for sql in SCHEMA:
+        connection.execute(sql)
+    uuids = []
+    emails = []
+    base_infos = []
+    invitations = []
+    student_infos = []
+    parents = []
+    ratings = []
+    for i in range(1, students + 1):
+        first_name = random_name(rng)
+        last_name = random_name(rng)
+        email = u'{0}.{1}{2}@example.com'.format(first_name, last_name, i)
+        invitation_uuid = str(uuid.UUID(int=rng.getrandbits(128)))
+        uuids.append(invitation_uuid)
+        emails.append(email)
+        base_infos.append((
+            i, first_name, last_name, email, rng.randint(1, GROUPS), 0))
+        invitations.append((i, i, invitation_uuid, 0))
+        student_infos.append((
+            i, i, first_name, last_name, email, rng.randint(6, 12)))
+        for j, relation in enumerate((u'M', u'T')):
+            parents.append((
+                2 * i + j, i, relation, random_name(rng), last_name))
+        program_ratings = list(range(1, PROGRAMS + 1))
+        rng.shuffle(program_ratings)
+        for program, rating in enumerate(program_ratings, 1):
+            ratings.append((i, program, rating))
+    connection.executemany(
+            'INSERT INTO nmadb_session_reg_baseinfo (id, first_name,'
+            ' last_name, email, section_id, payment)'
+            ' VALUES (?, ?, ?, ?, ?, ?)', base_infos)
+    connection.executemany(
+            'INSERT INTO nmadb_session_reg_invitation'
+            ' (id, base_id, uuid, payment) VALUES (?, ?, ?, ?)',
+            invitations)
+    connection.executemany(
+            'INSERT INTO nmadb_session_reg_studentinfo (id, invitation_id,'
+            ' first_name, last_name, email, school_class)'
+            ' VALUES (?, ?, ?, ?, ?, ?)', student_infos)
+    connection.executemany(
+            'INSERT INTO nmadb_session_reg_parentinfo (id, child_id,'
+            ' relation, first_name, last_name) VALUES (?, ?, ?, ?, ?)',
+            parents)
+    connection.executemany(
+            'INSERT INTO nmadb_session_reg_sessiongroup (id, title)'
+            ' VALUES (?, ?)',
+            [(i, u'Group {0}'.format(i)) for i in range(1, GROUPS + 1)])
+    connection.executemany(
+            'INSERT INTO nmadb_session_reg_sessionprogramrating'
+            ' (student_id, program_id, rating) VALUES (?, ?, ?)', ratings)
+    connection.commit()
+    return uuids, emails
+
+
+def hot_queries(uuids, emails, students, rng):
+    """ Returns ``(title, sql, parameter generator)`` tuples.
+    """
+    return (
+        ('Invitation by uuid',
+         'SELECT * FROM nmadb_session_reg_invitation WHERE uuid = ?',
+         lambda: (rng.choice(uuids),)),
+        ('BaseInfo by email',
+         'SELECT * FROM nmadb_session_reg_baseinfo WHERE email = ?',
+         lambda: (rng.choice(emails),)),
+        ('BaseInfo ordered page',
+         'SELECT * FROM nmadb_session_reg_baseinfo'
+         ' ORDER BY last_name, first_name LIMIT 100 OFFSET ?',
+         lambda: (rng.randint(0, students - 100),)),
+        ('StudentInfo ordered page',
+         'SELECT * FROM nmadb_session_reg_studentinfo'
+         ' ORDER BY last_name, first_name LIMIT 20 OFFSET ?',
+         lambda: (rng.randint(0, students - 20),)),
+        ('ParentInfo ordered page',
+         'SELECT * FROM nmadb_session_reg_parentinfo'
+         ' ORDER BY last_name, first_name LIMIT 100 OFFSET ?',
+         lambda: (rng.randint(0, students - 100),)),
+        ('SessionGroup by title',
+         'SELECT * FROM nmadb_session_reg_sessiongroup WHERE title = ?',
+         lambda: (u'Group {0}'.format(rng.randint(1, GROUPS)),)),
+        ('Top ratings of student',
+         'SELECT * FROM nmadb_session_reg_sessionprogramrating'
+         ' WHERE student_id = ? ORDER BY rating DESC LIMIT 3',
+         lambda: (rng.randint(1, students),)),
+        )
+
+
+def measure(connection, queries):
+    """ Prints query plan and average time of every query.
+    """
+    for title, sql, parameters in queries:
+        plan = connection.execute(
+                'EXPLAIN QUERY PLAN ' + sql, parameters()).fetchall()
+        start = time.time()
+        for i in range(REPEAT):
+            connection.execute(sql, parameters()).fetchall()
+        elapsed = (time.time() - start) / REPEAT * 1000
+        print('  {0:<26} {1:9.3f} ms'.format(title, elapsed))
+        for row in plan:
+            print('      {0}'.format(row[-1]))
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(2013)
+    connection = sqlite3.connect(':memory:')
+    print('Populating database with {0} students...'.format(students))
+    uuids, emails = populate(connection, students, rng)
+    queries = hot_queries(uuids, emails, students, rng)
+    print('Before indexes:')
+    measure(connection, queries)
+    for sql in INDEXES:
+        connection.execute(sql)
+    connection.execute('ANALYZE')
+    print('After indexes:')
+    measure(connection, queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/python
+""" Measures import time and number of database queries issued while
+loading the application: models, forms, admin registration and URLconf
+resolution. Both section based and program based modes are measured,
+each in a fresh interpreter.
+
+Usage::
+
+    python benchmarks/startup.py [number of repetitions]
+
+If ``DJANGO_SETTINGS_MODULE`` is not set, minimal settings with in
+memory SQLite databases are used.
+"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import time
+
+
+MODES = ('section', 'program')
+
+STEPS = (
+    ('models', 'nmadb_session_reg.models'),
+    ('forms', 'nmadb_session_reg.forms'),
+    ('admin', 'nmadb_session_reg.admin'),
+    ('urls', 'nmadb_session_reg.urls'),
+    )
+
+
+def configure():
+    """ Configures minimal settings unless real ones are given.
+    """
+    from django.conf import settings
+    if os.environ.get('DJANGO_SETTINGS_MODULE'):
+        return
+    database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+    settings.configure(
+            DEBUG=True,
+            DATABASES={
+                'default': dict(database),
+                'session-reg': dict(database),
+                },
+            DATABASE_ROUTERS=['nmadb_session_reg.router.SessionRegRouter'],
+            INSTALLED_APPS=(
+                'django.contrib.auth',
+                'django.contrib.contenttypes',
+                'django.contrib.sessions',
+                'django.contrib.admin',
+                'nmadb_automation',
+                'nmadb_registration',
+                'nmadb_session_reg',
+                ),
+            ROOT_URLCONF='nmadb_session_reg.urls',
+            )
+
+
+def measure(mode):
+    """ Loads the application in given mode and prints one line per
+    step: name, milliseconds and number of queries.
+    """
+    sys.path.insert(0, os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+    configure()
+    from django.core.urlresolvers import reverse
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+
+    from nmadb_session_reg.config import info
+    info.session_is_program_based = (mode == 'program')
+
+    contexts = [
+            CaptureQueriesContext(connections[alias])
+            for alias in connections]
+    for context in contexts:
+        context.__enter__()
+    previous = 0
+    for name, module in STEPS:
+        start = time.time()
+        __import__(module)
+        if name == 'admin':
+            from django.contrib import admin
+            admin.autodiscover()
+        elif name == 'urls':
+            reverse(
+                    'nmadb-session-reg-registration',
+                    args=['01234567-89ab-cdef-0123-456789abcdef'])
+        elapsed = time.time() - start
+        queries = sum(len(context) for context in contexts)
+        print(name, elapsed * 1000, queries - previous)
+        previous = queries
+    for context in contexts:
+        context.__exit__(None, None, None)
+
+
+def run(mode):
+    """ Measures given mode in a fresh interpreter.
+    """
+    output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--child', mode])
+    results = []
+    for line in output.decode('ascii').splitlines():
+        name, milliseconds, queries = line.split()
+        results.append((name, float(milliseconds), int(queries)))
+    return results
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        measure(sys.argv[2])
+        return
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print('{0:<10} {1:<8} {2:>10} {3:>8}'.format(
+        'mode', 'step', 'ms (best)', 'queries'))
+    failed = False
+    for mode in MODES:
+        runs = [run(mode) for _ in range(repetitions)]
+        for index, (name, milliseconds, queries) in enumerate(runs[0]):
+            best = min(results[index][1] for results in runs)
+            print('{0:<10} {1:<8} {2:>10.1f} {3:>8}'.format(
+                mode, name, best, queries))
+            failed = failed or queries != 0
+    if failed:
+        print('Loading the application issued database queries.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 import datetime
 
 from django.utils.translation import ugettext_lazy as _
-from django.db import transaction
+from django.core import urlresolvers
+from django.db.models import Q
 from django.contrib import admin
 
-from nmadb_session_reg import models
+from nmadb_session_reg import models, jobs
+from nmadb_session_reg.importer import iterate_batches
 from nmadb_utils import admin as utils
 from nmadb_session_reg.config import info
 
@@ -14,45 +16,113 @@ from nmadb_students import models as students
 from nmadb_session import models as sessions
 
 
+class ContactIndex(object):
+    """ Phone numbers and email addresses, which already exist in NMADB,
+    shared by all human updaters of a batch. New contacts are collected
+    and written by :meth:`flush`.
+    """
+
+    batch_size = 500
+
+    def __init__(self, phone_numbers, addresses):
+        self.phone_numbers = self._load(
+                contacts.Phone, 'number', phone_numbers)
+        self.addresses = self._load(
+                contacts.Email, 'address', addresses)
+        self.new_phones = []
+        self.new_emails = []
+
+    def _load(self, model, field, values):
+        """ Returns the set of given values, which exist in database.
+        """
+        existing = set()
+        values = sorted(set(value for value in values if value))
+        for batch in iterate_batches(values, self.batch_size):
+            existing.update(model.objects.filter(
+                **{field + '__in': batch}).values_list(field, flat=True))
+        return existing
+
+    def add_phone(self, phone):
+        """ Schedules phone for creation. Returns ``False`` if its number
+        already exists.
+        """
+        if phone.number in self.phone_numbers:
+            return False
+        self.phone_numbers.add(phone.number)
+        self.new_phones.append(phone)
+        return True
+
+    def add_email(self, email):
+        """ Schedules email for creation. Returns ``False`` if its
+        address already exists.
+        """
+        if email.address in self.addresses:
+            return False
+        self.addresses.add(email.address)
+        self.new_emails.append(email)
+        return True
+
+    def flush(self):
+        """ Writes scheduled contacts.
+        """
+        contacts.Phone.objects.bulk_create(self.new_phones)
+        contacts.Email.objects.bulk_create(self.new_emails)
+        self.new_phones = []
+        self.new_emails = []
+
+
 class HumanUpdater(object):
     """ Util object that helps to update info about human.
     """
 
-    def __init__(self, human, session, message_user):
+    def __init__(self, human, session, message_user, contact_index=None):
         self.human = human
         self.session = session
         self.last_time_used = session.begin - datetime.timedelta(days=10)
         self.message_user = message_user
+        self.contact_index = contact_index
 
     def update_phone(self, phone_number):
         """ If the phone number does not exist, then adds.
         """
         if not phone_number:
             return
-        try:
-            contacts.Phone.objects.get(number=phone_number)
-        except contacts.Phone.DoesNotExist:
-            phone = contacts.Phone()
-            phone.human = self.human
-            phone.number = phone_number
-            phone.last_time_used = self.last_time_used
-            phone.save()
-            self.notify_create('phone', phone.number)
+        phone = contacts.Phone()
+        phone.human = self.human
+        phone.number = phone_number
+        phone.last_time_used = self.last_time_used
+        if self.contact_index is not None:
+            if not self.contact_index.add_phone(phone):
+                return
+        else:
+            try:
+                contacts.Phone.objects.get(number=phone_number)
+            except contacts.Phone.DoesNotExist:
+                phone.save()
+            else:
+                return
+        self.notify_create('phone', phone.number)
 
     def update_email(self, address):
         """ If the email does not exist, then adds.
         """
         if not address:
             return
-        try:
-            contacts.Email.objects.get(address=address)
-        except contacts.Email.DoesNotExist:
-            email = contacts.Email()
-            email.human = self.human
-            email.address = address
-            email.last_time_used = self.last_time_used
-            email.save()
-            self.notify_create('email', email.address)
+        email = contacts.Email()
+        email.human = self.human
+        email.address = address
+        email.last_time_used = self.last_time_used
+        if self.contact_index is not None:
+            if not self.contact_index.add_email(email):
+                return
+        else:
+            try:
+                contacts.Email.objects.get(address=address)
+            except contacts.Email.DoesNotExist:
+                email.save()
+            else:
+                return
+        self.notify_create('email', email.address)
 
     def message(self, frmt, *args, **kwargs):
         """ Shows a message to user.
@@ -84,9 +154,10 @@ class StudentUpdater(HumanUpdater):
     """ Util object that helps to update info about student.
     """
 
-    def __init__(self, student, session, message_user):
+    def __init__(self, student, session, message_user,
+                 contact_index=None):
         super(StudentUpdater, self).__init__(
-                student, session, message_user)
+                student, session, message_user, contact_index)
         self.student = student
 
     def update_school_year(self, school_year, school_class):
@@ -120,7 +191,6 @@ class StudentUpdater(HumanUpdater):
         """
         parents_exists = self.student.parents.exists()
         for parent_info in parents:
-            print parent_info
             if parent_info.relation == u'N':
                 raise Exception("Internal error!")
             if parents_exists:
@@ -165,12 +235,425 @@ class StudentUpdater(HumanUpdater):
                         parent,
                         self.student)
             parent_updater = HumanUpdater(
-                    parent, session, self.message_user)
+                    parent, session, self.message_user, self.contact_index)
             parent_updater.update_phone(parent_info.phone_number)
             parent_updater.update_email(parent_info.email)
             parent.save()
 
 
+class StudentMatcher(object):
+    """ Matches base infos to NMADB students by email address (case
+    insensitive), first name and last name. Candidates for all base
+    infos are loaded at once, so that matching is done in memory.
+    """
+
+    batch_size = 400
+
+    def __init__(self, base_infos):
+        keys = set(self.key(
+            base_info.email, base_info.first_name, base_info.last_name)
+            for base_info in base_infos)
+        matches = {}
+        for batch in iterate_batches(sorted(keys), self.batch_size):
+            candidates = students.Student.objects.filter(
+                    first_name__in=set(key[1] for key in batch),
+                    last_name__in=set(key[2] for key in batch),
+                    ).values_list(
+                        'id', 'email__address', 'first_name', 'last_name')
+            for pk, email, first_name, last_name in candidates:
+                if email is None:
+                    continue
+                key = self.key(email, first_name, last_name)
+                if key in keys:
+                    matches.setdefault(key, set()).add(pk)
+        ids = set(pk for pks in matches.values() for pk in pks)
+        found = {}
+        for batch in iterate_batches(sorted(ids), self.batch_size):
+            found.update(students.Student.objects.in_bulk(batch))
+        self.matches = dict(
+                (key, [found[pk] for pk in pks if pk in found])
+                for key, pks in matches.items())
+
+    @staticmethod
+    def key(email, first_name, last_name):
+        """ Returns normalised lookup key.
+        """
+        return (email.strip().lower(), first_name, last_name)
+
+    def get(self, base_info):
+        """ Returns the student matching base info. Raises the same
+        exceptions as ``Student.objects.get``.
+        """
+        found = self.matches.get(self.key(
+            base_info.email, base_info.first_name, base_info.last_name))
+        if not found:
+            raise students.Student.DoesNotExist()
+        if len(found) > 1:
+            raise students.Student.MultipleObjectsReturned()
+        return found[0]
+
+
+class ParticipationCreator(object):
+    """ Creates academic participations of registered students in the
+    session and adds them to session groups (Template Method). Groups,
+    students, academics and existing participations are preloaded and
+    new rows are written with ``bulk_create``.
+
+    Subclasses define which registrations take part and to which unit
+    (session group or program) each of them is assigned.
+    """
+
+    batch_size = 400
+
+    def __init__(self, session, message_user):
+        self.session = session
+        self.message_user = message_user
+
+    def message(self, frmt, *args, **kwargs):
+        """ Shows a message to user.
+        """
+        self.message_user(frmt.format(*args, **kwargs))
+
+    def get_units(self):
+        """ Returns all units, which have session groups.
+        """
+        raise NotImplementedError()
+
+    def get_unit(self, registration_info):
+        """ Returns unit to which registration is assigned.
+        """
+        raise NotImplementedError()
+
+    def get_related(self):
+        """ Returns fields to select together with registrations.
+        """
+        return ('invitation__base__section',)
+
+    def skip(self, registration_info):
+        """ Checks if registration does not take part in the session.
+        """
+        return False
+
+    @staticmethod
+    def generate_key(unit):
+        """ Generates session group key for unit.
+        """
+        return u'{0.id} - {0.title}'.format(unit)
+
+    def load_groups(self):
+        """ Returns session groups of all units by key. Missing groups
+        are created.
+        """
+        keys = [self.generate_key(unit) for unit in self.get_units()]
+        groups = {}
+        for batch in iterate_batches(keys, self.batch_size):
+            for group in sessions.Group.objects.filter(
+                    session=self.session, comment__in=batch):
+                if group.comment in groups:
+                    raise sessions.Group.MultipleObjectsReturned(
+                            u'Several groups of {0} have comment '
+                            u'\u201e{1}\u201c.'.format(
+                                self.session, group.comment))
+                groups[group.comment] = group
+        for key in keys:
+            if key not in groups:
+                group = sessions.Group()
+                group.session = self.session
+                group.comment = key
+                group.save()
+                self.message(
+                        _(u'Created group: {0.id} {0.session} {0.comment}'),
+                        group)
+                groups[key] = group
+        return groups
+
+    def load_academics(self, students_ids):
+        """ Returns academics of given students by ``(student id,
+        section id)``.
+        """
+        found = {}
+        for batch in iterate_batches(students_ids, self.batch_size):
+            for academic in academics.Academic.objects.filter(
+                    student__in=batch):
+                found[academic.student_id, academic.section_id] = academic
+        return found
+
+    def load_participating(self, academics_ids):
+        """ Returns ids of academics, which already participate in the
+        session, mapped to participation ids.
+        """
+        found = {}
+        for batch in iterate_batches(academics_ids, self.batch_size):
+            found.update(
+                    sessions.AcademicParticipation.objects.filter(
+                        session=self.session,
+                        academic__in=batch,
+                        ).values_list('academic_id', 'id'))
+        return found
+
+    def create(self, registration_infos):
+        """ Creates participation entries for given registrations.
+        """
+        registration_infos = [
+                registration_info
+                for registration_info in registration_infos.select_related(
+                    *self.get_related())
+                if not self.skip(registration_info)]
+        groups = self.load_groups()
+        matcher = StudentMatcher(
+                registration_info.invitation.base
+                for registration_info in registration_infos)
+        sections = dict(
+                (section.title.lower(), section)
+                for section in academics.Section.objects.all())
+
+        entries = []
+        for registration_info in registration_infos:
+            invitation = registration_info.invitation
+            base_info = invitation.base
+            try:
+                student = matcher.get(base_info)
+            except students.Student.DoesNotExist:
+                self.message(
+                        _(u'Ignored: {0.first_name} {0.last_name}'),
+                        base_info)
+                continue
+            unit = self.get_unit(registration_info)
+            if unit is None:
+                self.message(
+                        _(u'Not assigned: {0.first_name} {0.last_name}'),
+                        base_info)
+                continue
+            section = sections.get(base_info.section.title.lower())
+            if section is None:
+                self.message(
+                        _(u'No section: {0.first_name} {0.last_name} '
+                          u'({0.section.title})'),
+                        base_info)
+                continue
+            entries.append((student, section, invitation.payment, unit))
+
+        student_academics = self.load_academics(
+                sorted(set(entry[0].id for entry in entries)))
+        participating = self.load_participating(sorted(
+            academic.id for academic in student_academics.values()))
+
+        participations = []
+        created = []
+        for student, section, payment, unit in entries:
+            academic = student_academics.get((student.id, section.id))
+            if academic is None:
+                self.message(
+                        _(u'No academic: {0.first_name} {0.last_name}'),
+                        student)
+                continue
+            if academic.id in participating:
+                continue
+            participating[academic.id] = None
+            participation = sessions.AcademicParticipation()
+            participation.academic = academic
+            participation.session = self.session
+            participation.payment = payment
+            participations.append(participation)
+            created.append((
+                academic.id, student, groups[self.generate_key(unit)]))
+        sessions.AcademicParticipation.objects.bulk_create(participations)
+
+        ids = self.load_participating([entry[0] for entry in created])
+        field = sessions.Group._meta.get_field('academics')
+        through = field.rel.through
+        group_field = field.m2m_field_name() + '_id'
+        participation_field = field.m2m_reverse_field_name() + '_id'
+        through.objects.bulk_create([
+            through(**{
+                group_field: group.id,
+                participation_field: ids[academic_id],
+                })
+            for academic_id, student, group in created])
+        for academic_id, student, group in created:
+            self.message(
+                    _(
+                        u'Created participation '
+                        u'({0.id} {0.first_name} {0.last_name}) '
+                        u'{1} '
+                        u'and added to {2.id} {2.comment}'
+                        ),
+                    student, self.session, group)
+
+
+class SectionParticipationCreator(ParticipationCreator):
+    """ Participation creator for section based sessions.
+    """
+
+    def get_units(self):
+        return models.SessionGroup.objects.all()
+
+    def get_unit(self, registration_info):
+        return registration_info.assigned_session_group
+
+    def get_related(self):
+        return super(SectionParticipationCreator, self).get_related() + (
+                'assigned_session_group',)
+
+
+class ProgramParticipationCreator(ParticipationCreator):
+    """ Participation creator for program based sessions. Only chosen
+    students take part.
+    """
+
+    def get_units(self):
+        return models.SessionProgram.objects.all()
+
+    def get_unit(self, registration_info):
+        return registration_info.assigned_session_program
+
+    def get_related(self):
+        return super(ProgramParticipationCreator, self).get_related() + (
+                'assigned_session_program',)
+
+    def skip(self, registration_info):
+        return not registration_info.chosen
+
+
+def update_students(registration_infos, session, message_user):
+    """ Updates info about each student in NMADB.
+    """
+    registration_infos = list(
+            registration_infos.select_related('invitation__base'))
+    matcher = StudentMatcher(
+            registration_info.invitation.base
+            for registration_info in registration_infos)
+    parents = {}
+    for batch in iterate_batches(
+            [registration_info.pk
+             for registration_info in registration_infos],
+            ContactIndex.batch_size):
+        for parent_info in models.ParentInfo.objects.filter(
+                child__in=batch):
+            parents.setdefault(parent_info.child_id, []).append(
+                    parent_info)
+    phone_numbers = []
+    addresses = []
+    for registration_info in registration_infos:
+        phone_numbers.append(registration_info.phone_number)
+        addresses.append(registration_info.email)
+        for parent_info in parents.get(registration_info.pk, ()):
+            phone_numbers.append(parent_info.phone_number)
+            addresses.append(parent_info.email)
+    contact_index = ContactIndex(phone_numbers, addresses)
+    for registration_info in registration_infos:
+        base_info = registration_info.invitation.base
+        try:
+            student = matcher.get(base_info)
+        except students.Student.DoesNotExist:
+            message_user(
+                    _(u'Ignored: {0.first_name} {0.last_name}').format(
+                        base_info))
+        else:
+            student_updater = StudentUpdater(
+                    student,
+                    session,
+                    message_user,
+                    contact_index,
+                    )
+            student_updater.update_phone(
+                    registration_info.phone_number)
+            student_updater.update_email(
+                    registration_info.email)
+            student_updater.update_school_year(
+                    registration_info.school_year,
+                    registration_info.school_class)
+            student_updater.update_main_address(None)
+            student_updater.update_parents(
+                    parents.get(registration_info.pk, ()),
+                    session)
+            student.save()
+    contact_index.flush()
+
+
+def get_session():
+    """ Returns the current session object.
+    """
+    year = info.year
+    if info.session.endswith(u'pavasario'):
+        # Assuming that session type is program based.
+        session_type = u'Sp'
+    elif info.session.endswith(u'vasaros'):
+        session_type = u'Su'
+    elif info.session.endswith(u'rudens'):
+        # Assuming that session type is program based.
+        session_type = u'Au'
+    elif info.session.endswith(u'\u017eiemos'):
+        session_type = u'Wi'
+    else:
+        raise Exception(u'Uknown session type')
+
+    session = sessions.Session.objects.get(
+            year=year,
+            session_type=session_type,
+            )
+    return session
+
+
+@jobs.register('update')
+def update_job(registration_infos, message_user):
+    """ Job handler of the ``update`` action.
+    """
+    update_students(registration_infos, get_session(), message_user)
+
+
+SYNC_WATERMARK = u'nmadb-update'
+
+
+def changed_registrations():
+    """ Returns registrations, which themselves, their parents or home
+    addresses changed after the last synchronisation.
+    """
+    queryset = models.RegistrationInfo.objects.all()
+    try:
+        timestamp = models.SyncWatermark.objects.get(
+                name=SYNC_WATERMARK).timestamp
+    except models.SyncWatermark.DoesNotExist:
+        return queryset
+    return queryset.filter(
+            Q(modified_timestamp__gt=timestamp) |
+            Q(parentinfo__modified_timestamp__gt=timestamp)).distinct()
+
+
+def set_sync_watermark(job):
+    """ Marks changes made before the job selection was read as
+    synchronised.
+    """
+    watermark, created = models.SyncWatermark.objects.get_or_create(
+            name=SYNC_WATERMARK, defaults={'timestamp': job.selected})
+    if not created:
+        watermark.timestamp = job.selected
+        watermark.save()
+
+
+@jobs.register('update_changed', finished=set_sync_watermark)
+def update_changed_job(registration_infos, message_user):
+    """ Job handler of the ``update_changed`` action.
+    """
+    update_students(registration_infos, get_session(), message_user)
+
+
+@jobs.register('create_program_based')
+def create_program_based_job(registration_infos, message_user):
+    """ Job handler of the ``create_program_based`` action.
+    """
+    ProgramParticipationCreator(
+            get_session(), message_user).create(registration_infos)
+
+
+@jobs.register('create_section_based')
+def create_section_based_job(registration_infos, message_user):
+    """ Job handler of the ``create_section_based`` action.
+    """
+    SectionParticipationCreator(
+            get_session(), message_user).create(registration_infos)
+
+
 class BaseInfoAdmin(utils.ModelAdmin):
     """ Administration for BaseInfo.
     """
@@ -243,6 +726,7 @@ class RegistrationInfoAdmin(utils.ModelAdmin):
 
     actions = utils.ModelAdmin.actions + [
             'update',
+            'update_changed',
             'create_program_based',
             'create_section_based',
             'show_message',
@@ -250,197 +734,6 @@ class RegistrationInfoAdmin(utils.ModelAdmin):
 
     list_per_page = 20
 
-    def _update_db_info_about_students(
-            self, request, registration_infos, session):
-        """ Updates info about each student.
-        """
-        for registration_info in registration_infos:
-            invitation = registration_info.invitation
-            base_info = invitation.base
-            try:
-                student = students.Student.objects.distinct().get(
-                        email__address__iexact=base_info.email,
-                        first_name=base_info.first_name,
-                        last_name=base_info.last_name,
-                        )
-            except students.Student.DoesNotExist:
-                self.message_user(
-                        request,
-                        _(u'Ignored: {0.first_name} {0.last_name}').format(
-                            base_info))
-            else:
-                section = academics.Section.objects.get(
-                        title__iexact=base_info.section)
-                print registration_info
-                student_updater = StudentUpdater(
-                        student,
-                        session,
-                        lambda x: self.message_user(request, x)
-                        )
-                student_updater.update_phone(
-                        registration_info.phone_number)
-                student_updater.update_email(
-                        registration_info.email)
-                student_updater.update_school_year(
-                        registration_info.school_year,
-                        registration_info.school_class)
-                student_updater.update_main_address(None)
-                student_updater.update_parents(
-                        registration_info.parentinfo_set.all(),
-                        session)
-                student.save()
-
-    def _get_section(self, title):
-        """ Returns the section by title.
-        """
-        section = academics.Section.objects.get(title__iexact=title)
-        return section
-
-    # TODO: Merge these methods by using Method Template design pattern.
-
-    def _create_session_participation_entries_section_based(
-            self, request, registration_infos, session):
-        """ Creates participation entries.
-        """
-        assert not info.session_is_program_based
-        def generate_key(session_group):
-            """ Generates key for session group.
-            """
-            return u'{0.id} - {0.title}'.format(session_group)
-        groups = {}
-        for session_group in models.SessionGroup.objects.all():
-            key = generate_key(session_group)
-            try:
-                group = sessions.Group.objects.get(comment=key)
-            except sessions.Group.DoesNotExist:
-                group = sessions.Group()
-                group.session = session
-                group.comment = key
-                group.save()
-                self.message_user(
-                        request,
-                        _(u'Created group: {0.id} {0.session} {0.comment}'
-                            ).format(group))
-            groups[key] = group
-
-        for registration_info in registration_infos:
-            #if not registration_info.chosen:
-                #continue
-            invitation = registration_info.invitation
-            base_info = invitation.base
-            payment = invitation.payment
-            try:
-                student = students.Student.objects.distinct().get(
-                        email__address__iexact=base_info.email,
-                        first_name=base_info.first_name,
-                        last_name=base_info.last_name,
-                        )
-            except students.Student.DoesNotExist:
-                self.message_user(
-                        request,
-                        _(u'Ignored: {0.first_name} {0.last_name}').format(
-                            base_info))
-            else:
-                section = self._get_section(base_info.section)
-                print registration_info
-                academic = student.academic_set.get(section=section)
-                try:
-                    participation = (
-                            sessions.AcademicParticipation.objects.get(
-                                academic = academic,
-                                session = session,
-                                ))
-                except sessions.AcademicParticipation.DoesNotExist:
-                    participation = sessions.AcademicParticipation()
-                    participation.academic = academic
-                    participation.session = session
-                    participation.payment = payment
-                    participation.save()
-                    key = generate_key(
-                            registration_info.assigned_session_group)
-                    group = groups[key]
-                    group.academics.add(participation)
-                    self.message_user(
-                            request,
-                            _(
-                                u'Created participation '
-                                u'({0.id} {0.first_name} {0.last_name}) '
-                                u'{1} '
-                                u'and added to {2.id} {2.comment}'
-                                ).format(student, session, group))
-
-
-    def _create_session_participation_entries_program_based(
-            self, request, registration_infos, session):
-        """ Creates participation entries.
-        """
-        assert info.session_is_program_based
-        def generate_key(program):
-            """ Generates key for session program.
-            """
-            return u'{0.id} - {0.title}'.format(program)
-        groups = {}
-        for program in models.SessionProgram.objects.all():
-            key = generate_key(program)
-            try:
-                group = sessions.Group.objects.get(comment=key)
-            except sessions.Group.DoesNotExist:
-                group = sessions.Group()
-                group.session = session
-                group.comment = key
-                group.save()
-                self.message_user(
-                        request,
-                        _(u'Created group: {0.id} {0.session} {0.comment}'
-                            ).format(group))
-            groups[key] = group
-
-        for registration_info in registration_infos:
-            if not registration_info.chosen:
-                continue
-            invitation = registration_info.invitation
-            base_info = invitation.base
-            payment = invitation.payment
-            try:
-                student = students.Student.objects.distinct().get(
-                        email__address__iexact=base_info.email,
-                        first_name=base_info.first_name,
-                        last_name=base_info.last_name,
-                        )
-            except students.Student.DoesNotExist:
-                self.message_user(
-                        request,
-                        _(u'Ignored: {0.first_name} {0.last_name}').format(
-                            base_info))
-            else:
-                section = self._get_section(base_info.section)
-                print registration_info
-                academic = student.academic_set.get(section=section)
-                try:
-                    participation = (
-                            sessions.AcademicParticipation.objects.get(
-                                academic = academic,
-                                session = session,
-                                ))
-                except sessions.AcademicParticipation.DoesNotExist:
-                    participation = sessions.AcademicParticipation()
-                    participation.academic = academic
-                    participation.session = session
-                    participation.payment = payment
-                    participation.save()
-                    key = generate_key(
-                            registration_info.assigned_session_program)
-                    group = groups[key]
-                    group.academics.add(participation)
-                    self.message_user(
-                            request,
-                            _(
-                                u'Created participation '
-                                u'({0.id} {0.first_name} {0.last_name}) '
-                                u'{1} '
-                                u'and added to {2.id} {2.comment}'
-                                ).format(student, session, group))
-
     def show_message(self, request, queryset):
         """ For testing messaging framework.
         """
@@ -449,72 +742,93 @@ class RegistrationInfoAdmin(utils.ModelAdmin):
                 _(u'Selected {0} entries.').format(
                     queryset.count()))
 
-    def _get_session(self):
-        """ Returns the current session object.
+    def _enqueue(self, request, action, queryset):
+        """ Queues a job for selected registrations.
         """
-        year = info.year
-        if info.session.endswith(u'pavasario'):
-            # Assuming that session type is program based.
-            session_type = u'Sp'
-        elif info.session.endswith(u'vasaros'):
-            session_type = u'Su'
-        elif info.session.endswith(u'rudens'):
-            # Assuming that session type is program based.
-            session_type = u'Au'
-        elif info.session.endswith(u'\u017eiemos'):
-            session_type = u'Wi'
-        else:
-            raise Exception(u'Uknown session type')
-
-        session = sessions.Session.objects.get(
-                year=year,
-                session_type=session_type,
-                )
-        return session
+        job = jobs.enqueue(action, queryset)
+        self.message_user(
+                request,
+                _(u'Queued job {0.id} for {0.total} entries. Progress: {1}'
+                    ).format(
+                        job,
+                        urlresolvers.reverse(
+                            'admin:nmadb_session_reg_job_change',
+                            args=(job.id,))))
 
-    @transaction.atomic
     def update(self, request, queryset):
         """ Copies to nmadb_session.
         """
-        session = self._get_session()
-
-        self._update_db_info_about_students(
-                request,
-                queryset,
-                #models.RegistrationInfo.objects.all(),
-                session)
+        self._enqueue(request, 'update', queryset)
     update.short_description = _(
             u'Update NMADB info with collected data.')
 
-    @transaction.atomic
+    def update_changed(self, request, queryset):
+        """ Copies to nmadb_session all registrations changed since the
+        last run of this action. The selection is ignored, because the
+        watermark covers all registrations.
+        """
+        self._enqueue(request, 'update_changed', changed_registrations())
+    update_changed.short_description = _(
+            u'Update NMADB info with data changed since the last run.')
+
     def create_program_based(self, request, queryset):
         """ Creates participation entries.
         """
-        session = self._get_session()
-
-        self._create_session_participation_entries_program_based(
-                request,
-                queryset,
-                #models.RegistrationInfo.objects.all(),
-                session)
+        self._enqueue(request, 'create_program_based', queryset)
     create_program_based.short_description = _(
             u'Create program based participation entries.')
 
-    @transaction.atomic
     def create_section_based(self, request, queryset):
         """ Creates participation entries.
         """
-        session = self._get_session()
-
-        self._create_session_participation_entries_section_based(
-                request,
-                queryset,
-                #models.RegistrationInfo.objects.all(),
-                session)
+        self._enqueue(request, 'create_section_based', queryset)
     create_section_based.short_description = _(
             u'Create section based participation entries.')
 
 
+class JobAdmin(utils.ModelAdmin):
+    """ Administration for jobs. Change page shows job progress.
+    """
+
+    list_display = (
+            'id',
+            'action',
+            'status',
+            'processed',
+            'total',
+            'progress',
+            'created',
+            'finished',
+            )
+
+    list_filter = (
+            'action',
+            'status',
+            )
+
+    readonly_fields = (
+            'action',
+            'status',
+            'total',
+            'processed',
+            'progress',
+            'messages',
+            'error',
+            'created',
+            'selected',
+            'started',
+            'finished',
+            'heartbeat',
+            )
+
+    exclude = (
+            'object_ids',
+            )
+
+    def has_add_permission(self, request):
+        return False
+
+
 class ParentInfoAdmin(utils.ModelAdmin):
     """ Administration for parent info.
     """
@@ -541,3 +855,4 @@ class ParentInfoAdmin(utils.ModelAdmin):
 admin.site.register(models.BaseInfo, BaseInfoAdmin)
 admin.site.register(models.RegistrationInfo, RegistrationInfoAdmin)
 admin.site.register(models.ParentInfo, ParentInfoAdmin)
+admin.site.register(models.Job, JobAdmin)
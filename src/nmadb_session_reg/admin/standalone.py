@@ -4,6 +4,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.contrib.sites.models import Site
 
 from nmadb_session_reg import models
+from nmadb_session_reg.assignment import assign_programs
 from nmadb_utils import admin as utils
 from nmadb_utils import actions
 from nmadb_utils.pdf import render_to_pdf
@@ -59,9 +60,14 @@ class SessionProgramAdmin(utils.ModelAdmin):
     list_display = (
             'id',
             'title',
+            'capacity',
             'description',
             )
 
+    list_editable = (
+            'capacity',
+            )
+
 
 class SessionGroupAdmin(utils.ModelAdmin):
     """ Administration for session group.
@@ -345,6 +351,26 @@ class RegistrationInfoSectionAdmin(RegistrationInfoAdminBase):
             )
 
 
+class FirstSelectionListFilter(admin.SimpleListFilter):
+    """ Filters registrations by the highest rated session program.
+    """
+
+    title = _(u'first selection')
+    parameter_name = 'first_selection'
+
+    def lookups(self, request, model_admin):
+        return [
+                (program.id, program.title)
+                for program in models.SessionProgram.objects.all()
+                ]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                    top_selection__first_program=self.value())
+        return queryset
+
+
 class RegistrationInfoProgramAdmin(RegistrationInfoAdminBase):
     """ Administration for registration info.
     """
@@ -359,12 +385,36 @@ class RegistrationInfoProgramAdmin(RegistrationInfoAdminBase):
     list_filter = (
             'school_class',
             'assigned_session_program',
+            FirstSelectionListFilter,
             )
 
     list_editable = RegistrationInfoAdminBase.list_editable + (
             'assigned_session_program',
             )
 
+    actions = RegistrationInfoAdminBase.actions + [
+            'assign_programs',
+            ]
+
+    def get_queryset(self, request):
+        return super(RegistrationInfoProgramAdmin, self).get_queryset(
+                request).with_top_selections(3)
+
+    def assign_programs(self, request, queryset):
+        """ Assigns programs to selected students respecting program
+        capacities and student ratings.
+        """
+        assignment = assign_programs(queryset)
+        unassigned = sum(
+                1 for program in assignment.values() if program is None)
+        self.message_user(
+                request,
+                _(u'{0} students assigned to programs, {1} could not be '
+                  u'assigned.').format(
+                      len(assignment) - unassigned, unassigned))
+    assign_programs.short_description = _(
+            u'assign programs automatically')
+
 
 class ParentInfoAdmin(utils.ModelAdmin):
     """ Administration for parent info.
@@ -393,6 +443,10 @@ actions.register(
         'nmadb-session-reg-import-base-info',
         _(u'Import student base info'),
         'nmadb-session-reg-import-base-info')
+actions.register(
+        'nmadb-session-reg-import-base-info-stream',
+        _(u'Import student base info from large CSV file'),
+        'nmadb-session-reg-import-base-info-stream')
 
 
 if info.session_is_program_based:
@@ -0,0 +1,206 @@
+import heapq
+from collections import defaultdict
+
+
+UNASSIGNED = None
+
+
+class AssignmentSolver(object):
+    """ Capacity aware assignment of students to programs.
+
+    Computes a minimum cost flow from students to programs by
+    successive shortest paths (Hungarian algorithm generalised to
+    program capacities). Students are added one by one; every new
+    student is routed along the shortest augmenting path, which may
+    move already assigned students between programs. Shortest paths are
+    searched with Dijkstra over program nodes only: edge from program
+    ``p`` to program ``q`` is the cheapest move of a student assigned
+    to ``p`` into ``q``. Edge costs are kept in lazily updated heaps and
+    made non-negative with node potentials.
+
+    The result first maximises the number of assigned students and then
+    the sum of their ratings.
+    """
+
+    def __init__(self, preferences, capacities):
+        """ ``preferences`` maps student to a dictionary, which maps
+        program to rating (the bigger, the better). ``capacities`` maps
+        program to its capacity; ``None`` means unlimited. Students are
+        never assigned to programs they did not rate.
+        """
+        self.preferences = preferences
+        self.capacities = dict(capacities)
+        self.capacities[UNASSIGNED] = None
+        self.nodes = list(self.capacities)
+        self.order = dict((node, i) for i, node in enumerate(self.nodes))
+        max_rating = max([
+            rating
+            for ratings in preferences.values()
+            for rating in ratings.values()] or [0])
+        self.weight = len(preferences) * max_rating + 1
+        self.assignment = {}
+        self.load = defaultdict(int)
+        self.potential = dict((node, 0) for node in self.nodes)
+        self.moves = defaultdict(list)
+
+    def cost(self, student, program):
+        """ Returns the cost of assigning student to program, or
+        ``None`` if that is not allowed.
+        """
+        if program is UNASSIGNED:
+            return 0
+        rating = self.preferences[student].get(program)
+        if rating is None or program not in self.capacities:
+            return None
+        return -(self.weight + rating)
+
+    def _targets(self, student):
+        """ Programs to which student can be assigned.
+        """
+        return [
+                program
+                for program in list(self.preferences[student]) + [
+                    UNASSIGNED]
+                if self.cost(student, program) is not None]
+
+    def _place(self, student, program):
+        """ Assigns student to program and registers possible moves.
+        """
+        old = self.assignment.get(student, False)
+        if old is not False:
+            self.load[old] -= 1
+        self.assignment[student] = program
+        self.load[program] += 1
+        current = self.cost(student, program)
+        for target in self._targets(student):
+            if target != program:
+                heapq.heappush(
+                        self.moves[program, target],
+                        (self.cost(student, target) - current, student))
+
+    def _move(self, source, target):
+        """ Returns the cheapest ``(cost, student)`` move of a student
+        assigned to ``source`` into ``target`` or ``None``.
+        """
+        heap = self.moves.get((source, target))
+        while heap:
+            cost, student = heap[0]
+            if self.assignment[student] == source:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _is_free(self, program):
+        """ Checks if program has free capacity.
+        """
+        capacity = self.capacities[program]
+        return capacity is None or self.load[program] < capacity
+
+    def add(self, student):
+        """ Assigns new student along the shortest augmenting path.
+        """
+        distance = {}
+        previous = {}
+        queue = []
+        for program in self._targets(student):
+            label = self.cost(student, program) - self.potential[program]
+            distance[program] = label
+            previous[program] = None
+            queue.append((label, self.order[program], program))
+        heapq.heapify(queue)
+        done = set()
+        while queue:
+            label, order, program = heapq.heappop(queue)
+            if program in done or label > distance[program]:
+                continue
+            done.add(program)
+            for target in self.nodes:
+                if target in done or target == program:
+                    continue
+                move = self._move(program, target)
+                if move is None:
+                    continue
+                cost, moved = move
+                new_label = (
+                        label + cost +
+                        self.potential[program] - self.potential[target])
+                if target not in distance or new_label < distance[target]:
+                    distance[target] = new_label
+                    previous[target] = (program, moved)
+                    heapq.heappush(
+                            queue, (new_label, self.order[target], target))
+        end = min(
+                (distance[program] + self.potential[program],
+                 self.order[program], program)
+                for program in done
+                if self._is_free(program))[2]
+        path = []
+        program = end
+        while previous[program] is not None:
+            source, moved = previous[program]
+            path.append((moved, program))
+            program = source
+        path.append((student, program))
+        for moved, program in path:
+            self._place(moved, program)
+        highest = max(distance[program] for program in done)
+        for node in self.nodes:
+            if node in done:
+                self.potential[node] += distance[node]
+            else:
+                self.potential[node] += highest
+
+    def solve(self):
+        """ Returns dictionary that maps every student to assigned
+        program or ``None``.
+        """
+        for student in sorted(self.preferences):
+            self.add(student)
+        return dict(self.assignment)
+
+
+def solve_assignment(preferences, capacities):
+    """ See :class:`AssignmentSolver`.
+    """
+    return AssignmentSolver(preferences, capacities).solve()
+
+
+def assign_programs(registration_infos):
+    """ Computes optimal program assignment for given registration
+    infos and saves it. Capacity of every program is reduced by the
+    number of students already assigned to it, which are not among
+    ``registration_infos``.
+
+    Returns the dictionary of computed assignments.
+    """
+    from django.db import router, transaction
+    from django.db.models import Count
+    from nmadb_session_reg import models
+
+    ids = [registration_info.pk for registration_info in registration_infos]
+    preferences = dict((pk, {}) for pk in ids)
+    for student_id, program_id, rating in (
+            models.SessionProgramRating.objects.filter(
+                student__in=ids).values_list(
+                    'student_id', 'program_id', 'rating')):
+        preferences[student_id][program_id] = rating
+    capacities = dict(
+            models.SessionProgram.objects.values_list('id', 'capacity'))
+    for program_id, count in (
+            models.RegistrationInfo.objects.exclude(id__in=ids).filter(
+                assigned_session_program__isnull=False).values_list(
+                    'assigned_session_program').annotate(Count('id'))):
+        if capacities.get(program_id) is not None:
+            capacities[program_id] = max(capacities[program_id] - count, 0)
+    assignment = solve_assignment(preferences, capacities)
+    groups = defaultdict(list)
+    for pk, program_id in assignment.items():
+        groups[program_id].append(pk)
+    using = router.db_for_write(models.RegistrationInfo)
+    with transaction.atomic(using=using):
+        for program_id, pks in groups.items():
+            for start in range(0, len(pks), 500):
+                models.RegistrationInfo.objects.using(using).filter(
+                        id__in=pks[start:start + 500]).update(
+                            assigned_session_program=program_id)
+    return assignment
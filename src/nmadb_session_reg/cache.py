@@ -0,0 +1,216 @@
+import bisect
+import collections
+import threading
+import time
+import unicodedata
+import uuid
+
+from django.core.exceptions import ValidationError
+
+
+class MemoizedValidator(object):
+    """ Bounded LRU cache in front of the validator. Both cleaned values
+    and raised validation errors are remembered.
+    """
+
+    def __init__(self, validator, maxsize=4096,
+                 exception_type=ValidationError):
+        self.validator = validator
+        self.maxsize = maxsize
+        self.exception_type = exception_type
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        with self._lock:
+            try:
+                failed, result = self._cache.pop(value)
+            except KeyError:
+                self.misses += 1
+            else:
+                self._cache[value] = (failed, result)
+                self.hits += 1
+                if failed:
+                    raise result
+                return result
+        try:
+            result = self.validator(value)
+            failed = False
+        except self.exception_type as e:
+            result = e
+            failed = True
+        with self._lock:
+            self._cache[value] = (failed, result)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        if failed:
+            raise result
+        return result
+
+    def counters(self):
+        """ Returns ``(hits, misses)`` tuple.
+        """
+        return self.hits, self.misses
+
+    def clear(self):
+        """ Forgets cached values and resets counters.
+        """
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class VersionedCache(object):
+    """ Process level cache of a value, which is valid while its version
+    stamp stays the same. The stamp is kept in the Django cache
+    framework, therefore with a shared cache backend (for example,
+    memcached or database cache) bumping it invalidates the value in all
+    workers immediately.
+
+    A process local backend (the default ``LocMemCache``) can not see
+    stamps bumped by other workers, therefore the value is also reloaded
+    when it is older than ``NMADB_SESSION_REG_CACHE_TTL`` seconds (300
+    by default). Setting it to ``None`` disables the expiry.
+    """
+
+    def __init__(self, key, loader):
+        self.key = key
+        self.loader = loader
+        self._version = None
+        self._value = None
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def ttl(self):
+        """ Returns the maximum age of the value in seconds or ``None``.
+        """
+        from django.conf import settings
+        return getattr(settings, 'NMADB_SESSION_REG_CACHE_TTL', 300)
+
+    def version(self):
+        """ Returns the current version stamp.
+        """
+        from django.core.cache import cache
+        version = cache.get(self.key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(self.key, version, None):
+                version = cache.get(self.key, version)
+        return version
+
+    def get(self):
+        """ Returns the value, which is reloaded if the version stamp
+        changed or the value expired.
+        """
+        version = self.version()
+        ttl = self.ttl()
+        now = time.time()
+        with self._lock:
+            if version != self._version or (
+                    ttl is not None and now - self._loaded >= ttl):
+                self._value = self.loader()
+                self._version = version
+                self._loaded = now
+            return self._value
+
+    def invalidate(self):
+        """ Bumps the version stamp.
+        """
+        from django.core.cache import cache
+        cache.set(self.key, uuid.uuid4().hex, None)
+
+
+def _load_program_catalog():
+    """ Loads all session programs.
+    """
+    from nmadb_session_reg.models import SessionProgram
+    return list(SessionProgram.objects.all())
+
+
+program_catalog = VersionedCache(
+        u'nmadb-session-reg-program-catalog', _load_program_catalog)
+
+
+def _load_session_groups():
+    """ Loads the map from section id to the session group with the
+    same title.
+    """
+    from nmadb_registration.models import Section
+    from nmadb_session_reg.models import SessionGroup
+    groups = dict(
+            (group.title, group)
+            for group in SessionGroup.objects.all())
+    return dict(
+            (section_id, groups[title])
+            for section_id, title in Section.objects.values_list(
+                'id', 'title')
+            if title in groups)
+
+
+session_groups = VersionedCache(
+        u'nmadb-session-reg-session-groups', _load_session_groups)
+
+
+def fold_title(title):
+    """ Lower cases title, strips diacritics (for example, Lithuanian
+    \u0105, \u010d, \u0117 become a, c, e) and collapses whitespace.
+    """
+    decomposed = unicodedata.normalize(u'NFKD', title.lower())
+    return u' '.join(u''.join(
+        char
+        for char in decomposed
+        if not unicodedata.combining(char)).split())
+
+
+class SchoolIndex(object):
+    """ In memory prefix index over folded school titles. Every word of
+    a title starts an index key, so that queries can match not only the
+    beginning of the title.
+    """
+
+    def __init__(self, schools):
+        """ ``schools`` is an iterable of ``(id, title)`` tuples.
+        """
+        self.titles = {}
+        entries = []
+        for pk, title in schools:
+            self.titles[pk] = title
+            words = fold_title(title).split()
+            for index in range(len(words)):
+                entries.append((u' '.join(words[index:]), pk))
+        entries.sort()
+        self.keys = [key for key, pk in entries]
+        self.ids = [pk for key, pk in entries]
+
+    def search(self, query, limit=20):
+        """ Returns at most ``limit`` ``(id, title)`` tuples of schools,
+        which have a word starting with folded ``query``.
+        """
+        prefix = fold_title(query)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        index = bisect.bisect_left(self.keys, prefix)
+        while (index < len(self.keys) and len(found) < limit and
+               self.keys[index].startswith(prefix)):
+            pk = self.ids[index]
+            if pk not in seen:
+                seen.add(pk)
+                found.append((pk, self.titles[pk]))
+            index += 1
+        return found
+
+
+def _load_school_index():
+    """ Builds school index from database.
+    """
+    from nmadb_registration.models import School
+    return SchoolIndex(School.objects.values_list('id', 'title'))
+
+
+school_index = VersionedCache(
+        u'nmadb-session-reg-school-index', _load_school_index)
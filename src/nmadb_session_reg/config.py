@@ -1,32 +1,78 @@
+import time
+
+from django.conf import settings
 from django.forms.models import model_to_dict
 
 
+INFO_CACHE_TTL = getattr(settings, 'NMADB_SESSION_REG_INFO_CACHE_TTL', 5)
+
+PROGRAM_BASED = getattr(settings, 'NMADB_SESSION_REG_PROGRAM_BASED', False)
+
+
 class Info(object):
     """ Session information object.
+
+    The info object is cached in process. At most every
+    ``INFO_CACHE_TTL`` seconds its version is compared with the one in
+    database and the object is reloaded, if somebody (possibly other
+    worker) changed it.
     """
 
     def __init__(self):
-        self.session_is_program_based = False
+        self.session_is_program_based = PROGRAM_BASED
         self._info_object = None
+        self._checked = None
+        self._dict = (None, None)
 
     def as_dict(self):
-        """ Returns data as Python dictionary.
+        """ Returns data as Python dictionary. The dictionary is shared
+        until the info object changes, therefore it must not be modified.
         """
-        return model_to_dict(self._info, fields=[], exclude=[])
+        info_object = self._info
+        version, data = self._dict
+        if data is None or version != info_object.version:
+            data = model_to_dict(info_object, fields=[], exclude=[])
+            self._dict = (info_object.version, data)
+        return data
 
     def __getattr__(self, name):
         return getattr(self._info, name)
 
+    def invalidate(self):
+        """ Forces to check the version on the next access.
+        """
+        self._checked = None
+
     @property
     def _info(self):
         """ Returns the info object.
         """
+        now = time.time()
         if self._info_object is None:
             self._info_object = self._get_info_object()
+            self._checked = now
+        elif self._checked is None or now - self._checked >= INFO_CACHE_TTL:
+            if self._get_version() != self._info_object.version:
+                self._info_object = self._get_info_object()
+            self._checked = now
         return self._info_object
 
+    def _get_version(self):
+        """ Returns version of the stored info object or ``None``.
+        """
+        from nmadb_session_reg.models import Info
+        from django.db.utils import OperationalError
+
+        try:
+            versions = list(Info.objects.order_by('pk').values_list(
+                'version', flat=True)[:1])
+        except OperationalError:
+            return None
+        return versions[0] if versions else None
+
     def _get_info_object(self):
-        """ Gets or crates the info object.
+        """ Gets the info object. If it is not stored yet, returns unsaved
+        object with default values, so that reading never writes.
         """
         from nmadb_session_reg.models import Info
         from django.db.utils import OperationalError
@@ -46,11 +92,8 @@ class Info(object):
             return info
 
         try:
-            info = Info.objects.all()[0]
-        except IndexError:
-            info = create_info()
-            info.save()
-        except OperationalError:
+            info = Info.objects.order_by('pk')[0]
+        except (IndexError, OperationalError):
             info = create_info()
         return info
 
@@ -1,15 +1,19 @@
 import datetime
+import functools
 
 from django.core import validators
 from django import forms
+from django.db import router, transaction
 from django.utils.translation import ugettext as _
 from django.utils.functional import lazy
+from django.utils.html import conditional_escape
 
 from db_utils.validators.name import (
         NamesValidator, SurnameValidator, ALPHABET_LT)
 from django_db_utils.forms import SpreadSheetField
 from pysheets.sheet import Sheet
-from nmadb_session_reg import models
+from nmadb_session_reg import models, cache
+from nmadb_session_reg.cache import MemoizedValidator
 from nmadb_registration.forms import ImportValidateRow
 from nmadb_registration.models import Section as SectionModel
 from nmadb_registration import forms as registration_forms
@@ -49,6 +53,35 @@ class ParentInfoForm(forms.ModelForm):
         exclude = ('child',)
 
 
+class BlankBaseInfo(object):
+    """ Stand-in for base info, which is used to render registration
+    form markup shared by all invitees. Placeholders are later replaced
+    with values of the concrete invitee.
+    """
+
+    PLACEHOLDERS = (
+            ('first_name', u'__nmadb_session_reg_first_name__'),
+            ('last_name', u'__nmadb_session_reg_last_name__'),
+            ('email', u'__nmadb_session_reg_email__'),
+            )
+
+    section_id = None
+
+    def __init__(self):
+        for name, placeholder in self.PLACEHOLDERS:
+            setattr(self, name, placeholder)
+
+    @classmethod
+    def fill(cls, content, base_info):
+        """ Replaces placeholders in ``content`` with escaped values of
+        ``base_info``.
+        """
+        for name, placeholder in cls.PLACEHOLDERS:
+            value = conditional_escape(getattr(base_info, name))
+            content = content.replace(placeholder, value)
+        return content
+
+
 class RegistrationFormSetBase(object):
     """ Formset that encapsulates checking of all registration
     forms.
@@ -187,27 +220,37 @@ class RegistrationFormSetBase(object):
         self.student.school_year = today.year + int(today.month >= 9)
         self.student.home_address = address
         if not info.session_is_program_based:
-            from nmadb_session_reg.models import SessionGroup
-            try:
-                session_group = SessionGroup.objects.get(
-                        title=self.base_info.section.title)
+            session_group = cache.session_groups.get().get(
+                    self.base_info.section_id)
+            if session_group is not None:
                 self.student.assigned_session_group = session_group
-            except SessionGroup.DoesNotExist:
-                pass
         self.student.save()
 
         self.base_info.generated_address = unicode(address)
         self.base_info.save()
 
     def save_parents(self):
-        """ Saves parent forms.
+        """ Saves parent forms with one query.
         """
-
+        parents = []
         for parent_form in self.parent_forms_valid:
             parent = parent_form.save(commit=False)
             parent.child = self.student
-            parent.save()
+            parents.append(parent)
+        models.ParentInfo.objects.bulk_create(parents)
 
+    def save_related(self):
+        """ Saves objects, which refer to the student.
+        """
+        self.save_parents()
+
+    def save(self):
+        """ Saves all forms in one transaction.
+        """
+        using = router.db_for_write(models.StudentInfo)
+        with transaction.atomic(using=using):
+            self.save_student()
+            self.save_related()
 
 
 class RegistrationFormSetProgram(RegistrationFormSetBase):
@@ -249,7 +292,9 @@ class RegistrationFormSetProgram(RegistrationFormSetBase):
         """ Rating forms list factory.
         """
         self.ratings = []
-        for program in models.SessionProgram.objects.all():
+        programs = cache.program_catalog.get()
+        rating_choices = get_rating_choices(programs)
+        for program in programs:
             rating = models.SessionProgramRating()
             rating.program = program
             self.ratings.append(rating)
@@ -257,7 +302,8 @@ class RegistrationFormSetProgram(RegistrationFormSetBase):
             return [
                     SessionProgramRatingForm(
                         instance=rating,
-                        prefix=u'rating_' + unicode(rating.program.id))
+                        prefix=u'rating_' + unicode(rating.program.id),
+                        rating_choices=rating_choices)
                     for rating in self.ratings
                     ]
         else:
@@ -265,21 +311,26 @@ class RegistrationFormSetProgram(RegistrationFormSetBase):
                     SessionProgramRatingForm(
                         self.POST,
                         instance=rating,
-                        prefix=u'rating_' + unicode(rating.program.id))
+                        prefix=u'rating_' + unicode(rating.program.id),
+                        rating_choices=rating_choices)
                     for rating in self.ratings
                     ]
 
     def save_ratings(self):
-        """ Saves rating forms.
+        """ Saves rating forms with one query.
+
+        .. note::
+            ``bulk_create`` does not send ``post_save`` signals, therefore
+            top selections of the student are refreshed explicitly.
         """
         for rating in self.ratings:
-            rating.student = student
-            rating.save()
+            rating.student = self.student
+        models.SessionProgramRating.objects.bulk_create(self.ratings)
+        models.TopSelection.objects.refresh([self.student.id])
 
-    def save(self):
-        """ Saves all forms.
+    def save_related(self):
+        """ Saves objects, which refer to the student.
         """
-        self.save_student()
         self.save_ratings()
         self.save_parents()
 
@@ -298,18 +349,13 @@ class RegistrationFormSetSection(RegistrationFormSetBase):
                 self._check_address_form() and
                 self._check_parent_forms())
 
-    def save(self):
-        """ Saves all forms.
-        """
-        self.save_student()
-        self.save_parents()
-
 
 if info.session_is_program_based:
     RegistrationFormSet = RegistrationFormSetProgram
     from nmadb_session_reg.forms.program_based import (
         StudentInfoForm,
         SessionProgramRatingForm,
+        get_rating_choices,
         )
 else:
     from nmadb_session_reg.forms.section_based import (
@@ -331,37 +377,85 @@ IMPORT_BASE_INFO_REQUIRED_COLUMNS = {
         #u'generated_address': _(u'Generated address'),
         #}
 
-NAME_VALIDATOR = NamesValidator(
-    ALPHABET_LT,
-    validation_exception_type=forms.ValidationError,
+NAME_VALIDATOR = MemoizedValidator(
+    NamesValidator(
+        ALPHABET_LT,
+        validation_exception_type=forms.ValidationError,
+        ),
+    exception_type=forms.ValidationError,
     )
 
-SURNAME_VALIDATOR = SurnameValidator(
-    ALPHABET_LT,
-    validation_exception_type=forms.ValidationError,
+SURNAME_VALIDATOR = MemoizedValidator(
+    SurnameValidator(
+        ALPHABET_LT,
+        validation_exception_type=forms.ValidationError,
+        ),
+    exception_type=forms.ValidationError,
     )
 
-def base_info_import_validate_row(sheet, row):
-    """ Checks if row is valid.
+def normalise_section_title(title):
+    """ Returns section title in the form used for case insensitive
+    lookups.
+    """
+    return u' '.join(unicode(title).split()).lower()
+
+
+class SectionLookup(object):
+    """ In-memory map from section titles to sections. All sections are
+    loaded with one query on the first lookup.
+    """
+
+    def __init__(self):
+        self._sections = None
+
+    def _load(self):
+        """ Loads sections from database.
+        """
+        sections = {}
+        for section in SectionModel.objects.all():
+            sections[section.title] = section
+            sections.setdefault(
+                    normalise_section_title(section.title), section)
+        return sections
+
+    def get(self, title):
+        """ Returns section with given title. Title is matched exactly
+        and then case insensitively.
+        """
+        if self._sections is None:
+            self._sections = self._load()
+        try:
+            return self._sections[title]
+        except KeyError:
+            pass
+        try:
+            return self._sections[normalise_section_title(title)]
+        except KeyError:
+            raise forms.ValidationError(
+                    _(u'Unknown section \u201c{0}\u201d.').format(title))
+
+
+def base_info_import_clean_row(row):
+    """ Checks and normalises row fields, which do not need database.
     """
-    print 'V1'
     row[u'first_name'] = NAME_VALIDATOR(row[u'first_name'])
     row[u'last_name'] = SURNAME_VALIDATOR(row[u'last_name'])
     validators.validate_email(row[u'email'])
     if row[u'payment'] < 0:
         raise forms.ValidationError(
                 _(u'Payment cannot be negative!'))
-    print 'V2'
-    try:
-        section = SectionModel.objects.get(
-                title=row[u'section'])
-    except SectionModel.DoesNotExist:
-        raise forms.ValidationError(
-                _(u'Unknown section \u201c{0}\u201d.').format(
-                    row[u'section']))
-    else:
-        row[u'section'] = section
-    print 'V3'
+    return row
+
+def base_info_import_validate_row(sheet, row, sections=None):
+    """ Checks if row is valid.
+
+    ``sections`` is :class:`SectionLookup` shared by all rows of the
+    spreadsheet. If it is not given, a new one is created.
+    """
+    row = base_info_import_clean_row(row)
+    if sections is None:
+        sections = SectionLookup()
+    row[u'section'] = sections.get(row[u'section'])
     return row
 
 def base_info_import_validate_sheet(spreadsheet, name, sheet):
@@ -378,7 +472,10 @@ def base_info_import_validate_sheet(spreadsheet, name, sheet):
                     u'payment'),
                 ),
             'insert')
-    sheet.add_validator(base_info_import_validate_row, 'insert')
+    sheet.add_validator(
+            functools.partial(
+                base_info_import_validate_row, sections=SectionLookup()),
+            'insert')
     return sheet, name
 
 class ImportBaseInfoForm(forms.Form):
@@ -404,3 +501,54 @@ class ImportBaseInfoForm(forms.Form):
                         for caption in
                         IMPORT_BASE_INFO_REQUIRED_COLUMNS.values()))
             )
+
+    upsert = forms.BooleanField(
+            label=_(u'Update existing'),
+            required=False,
+            help_text=_(
+                u'Update base infos with the same email, name, surname '
+                u'and section instead of creating duplicates.'),
+            )
+
+
+class StreamImportBaseInfoForm(forms.Form):
+    """ Form for importing large base info CSV files in chunks.
+    """
+
+    csv_file = forms.FileField(
+            label=_(u'CSV file'),
+            required=True,
+            help_text=_(
+                u'Please select UTF-8 encoded CSV file. First line '
+                u'must contain column captions. Required columns '
+                u'are: {0}.').format(
+                    u','.join(
+                        _(u'\u201c{0}\u201d').format(caption)
+                        for caption in
+                        IMPORT_BASE_INFO_REQUIRED_COLUMNS.values()))
+            )
+
+    batch_size = forms.IntegerField(
+            label=_(u'Batch size'),
+            min_value=1,
+            required=False,
+            help_text=_(u'Number of rows validated and committed at once.'),
+            )
+
+    start_row = forms.IntegerField(
+            label=_(u'Start after row'),
+            min_value=0,
+            initial=0,
+            required=False,
+            help_text=_(
+                u'Number of the last committed row reported by the '
+                u'failed import. Rows up to it are skipped.'),
+            )
+
+    upsert = forms.BooleanField(
+            label=_(u'Update existing'),
+            required=False,
+            help_text=_(
+                u'Update base infos with the same email, name, surname '
+                u'and section instead of creating duplicates.'),
+            )
@@ -1,8 +1,8 @@
 from django import forms
 from django.utils.translation import ugettext as _
-from django.utils.functional import lazy
 
-from nmadb_session_reg import models
+from nmadb_session_reg import models, cache
+from nmadb_session_reg.forms.widgets import SchoolAutocompleteWidget
 
 
 class StudentInfoForm(forms.ModelForm):
@@ -24,12 +24,18 @@ class StudentInfoForm(forms.ModelForm):
                 'comment',
                 'assigned_session_program',
                 )
+        widgets = {
+                'school': SchoolAutocompleteWidget(),
+                }
 
 
-def get_rating_choices():
-    """ Generates possible rating choices.
+def get_rating_choices(programs=None):
+    """ Generates possible rating choices for the list of programs
+    (taken from the program catalog, if not given).
     """
-    max_value = models.SessionProgram.objects.count() + 1
+    if programs is None:
+        programs = cache.program_catalog.get()
+    max_value = len(programs) + 1
     return tuple(zip(range(1, max_value), range(1, max_value)))
 
 class SessionProgramRatingForm(forms.ModelForm):
@@ -37,7 +43,7 @@ class SessionProgramRatingForm(forms.ModelForm):
     """
 
     rating = forms.ChoiceField(
-            choices=lazy(get_rating_choices, tuple)(),
+            choices=(),
             label=_(u'Rating'),
             widget=forms.Select(
                 attrs={'class': 'program-rating'},
@@ -56,3 +62,12 @@ class SessionProgramRatingForm(forms.ModelForm):
     class Meta(object):
         model = models.SessionProgramRating
         exclude = ('student', 'program',)
+
+    def __init__(self, *args, **kwargs):
+        rating_choices = kwargs.pop('rating_choices', None)
+        super(SessionProgramRatingForm, self).__init__(*args, **kwargs)
+        # Evaluated per form and not at import, because ChoiceField
+        # converts its choices to a list immediately.
+        if rating_choices is None:
+            rating_choices = get_rating_choices()
+        self.fields['rating'].choices = rating_choices
@@ -2,6 +2,7 @@ from django import forms
 from django.utils.translation import ugettext as _
 
 from nmadb_session_reg import models
+from nmadb_session_reg.forms.widgets import SchoolAutocompleteWidget
 
 
 class StudentInfoForm(forms.ModelForm):
@@ -22,3 +23,6 @@ class StudentInfoForm(forms.ModelForm):
                 'comment',
                 'assigned_session_group',
                 )
+        widgets = {
+                'school': SchoolAutocompleteWidget(),
+                }
@@ -0,0 +1,39 @@
+from django import forms
+from django.core import urlresolvers
+from django.utils.html import format_html
+
+from nmadb_session_reg import cache
+
+
+class SchoolAutocompleteWidget(forms.Widget):
+    """ Text input with suggestions from the school autocomplete view.
+    Chosen school id is submitted in a hidden input, therefore the list
+    of all schools is never rendered.
+    """
+
+    class Media(object):
+        js = ('nmadb-session-reg/school-autocomplete.js',)
+
+    def render(self, name, value, attrs=None):
+        title = u''
+        if value not in (None, u''):
+            try:
+                title = cache.school_index.get().titles.get(int(value), u'')
+            except (TypeError, ValueError):
+                pass
+        final_attrs = self.build_attrs(attrs)
+        input_id = final_attrs.get('id', name)
+        return format_html(
+                u'<input type="hidden" name="{0}" id="{1}" value="{2}" />'
+                u'<input type="text" id="{1}_title" list="{1}_list" '
+                u'value="{3}" autocomplete="off" '
+                u'data-school-autocomplete="" data-id-input="{1}" '
+                u'data-url="{4}" />'
+                u'<datalist id="{1}_list"></datalist>',
+                name,
+                input_id,
+                u'' if value is None else value,
+                title,
+                urlresolvers.reverse(
+                    'nmadb-session-reg-school-autocomplete'),
+                )
@@ -0,0 +1,419 @@
+import csv
+import multiprocessing
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router, transaction, DatabaseError
+from django.utils.translation import ugettext as _
+
+from nmadb_registration.models import Section
+from nmadb_session_reg import models, forms, cache
+
+
+IMPORT_BATCH_SIZE = getattr(
+        settings, 'NMADB_SESSION_REG_IMPORT_BATCH_SIZE', 500)
+IMPORT_PROCESSES = getattr(
+        settings, 'NMADB_SESSION_REG_IMPORT_PROCESSES', 1)
+
+
+def iterate_batches(iterable, batch_size):
+    """ Splits iterable into lists of at most batch_size elements.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_create_batches(model, objects, batch_size=None):
+    """ Inserts objects with one ``bulk_create`` per batch. Every
+    batch is committed in a separate transaction.
+
+    Returns a list of ``(number of objects, seconds)`` tuples, one for
+    each batch.
+    """
+    using = router.db_for_write(model)
+    timings = []
+    for batch in iterate_batches(objects, batch_size or IMPORT_BATCH_SIZE):
+        start = time.time()
+        with transaction.atomic(using=using):
+            model.objects.using(using).bulk_create(batch)
+        timings.append((len(batch), time.time() - start))
+    return timings
+
+
+def base_info_from_row(row):
+    """ Creates unsaved base info from validated spreadsheet row.
+    """
+    base_info = models.BaseInfo()
+    for attr in row.keys():
+        setattr(base_info, attr, row[attr])
+    base_info.human_id = None
+    base_info.comment = None
+    base_info.generated_address = None
+    return base_info
+
+
+def import_base_infos(rows, batch_size=None):
+    """ Creates base infos from validated rows in batches.
+    """
+    return bulk_create_batches(
+            models.BaseInfo,
+            (base_info_from_row(row) for row in rows),
+            batch_size)
+
+
+def base_info_key(email, first_name, last_name, section_id):
+    """ Returns normalised identity of the base info.
+    """
+    return (
+            email.strip().lower(),
+            first_name.strip().lower(),
+            last_name.strip().lower(),
+            section_id,
+            )
+
+
+class BaseInfoUpserter(object):
+    """ Inserts new base infos and updates the changed ones.
+
+    Base infos are identified by normalised email, first name, last
+    name and section. All existing base infos are indexed with one
+    query when upserter is created. If ``dry_run`` is true, changes
+    are only counted.
+    """
+
+    UPDATE_BATCH_SIZE = 500
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.timings = []
+        self._seen = set()
+        self._index = {}
+        for pk, email, first_name, last_name, section_id, payment in (
+                models.BaseInfo.objects.values_list(
+                    'id', 'email', 'first_name', 'last_name',
+                    'section_id', 'payment')):
+            key = base_info_key(email, first_name, last_name, section_id)
+            self._index.setdefault(key, [pk, payment])
+
+    def apply(self, rows):
+        """ Applies one batch of validated rows in one transaction.
+        """
+        start = time.time()
+        new = []
+        changed = defaultdict(list)
+        for row in rows:
+            key = base_info_key(
+                    row[u'email'], row[u'first_name'], row[u'last_name'],
+                    row[u'section'].id)
+            if key in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(key)
+            entry = self._index.get(key)
+            if entry is None:
+                new.append(base_info_from_row(row))
+            elif entry[1] != row[u'payment']:
+                changed[row[u'payment']].append(entry[0])
+                entry[1] = row[u'payment']
+            else:
+                self.unchanged += 1
+        if not self.dry_run:
+            self._write(new, changed)
+        self.inserted += len(new)
+        self.updated += sum(len(ids) for ids in changed.values())
+        self.timings.append((len(rows), time.time() - start))
+
+    def _write(self, new, changed):
+        """ Inserts ``new`` base infos and updates payments of
+        ``changed`` ones in one transaction.
+        """
+        using = router.db_for_write(models.BaseInfo)
+        with transaction.atomic(using=using):
+            for payment, ids in changed.items():
+                for batch in iterate_batches(ids, self.UPDATE_BATCH_SIZE):
+                    models.BaseInfo.objects.using(using).filter(
+                            id__in=batch).update(payment=payment)
+            models.BaseInfo.objects.using(using).bulk_create(new)
+
+    def summary(self):
+        """ Returns human readable summary of the changes.
+        """
+        return _(
+                u'{0} base infos inserted, {1} updated, {2} unchanged; '
+                u'{3} duplicate rows skipped.').format(
+                    self.inserted, self.updated, self.unchanged,
+                    self.duplicates)
+
+
+def upsert_base_infos(rows, batch_size=None):
+    """ Inserts or updates base infos from validated rows in batches.
+    Returns the used :class:`BaseInfoUpserter`.
+    """
+    upserter = BaseInfoUpserter()
+    for batch in iterate_batches(rows, batch_size or IMPORT_BATCH_SIZE):
+        upserter.apply(batch)
+    return upserter
+
+
+def upsert_titles(model, rows, using, batch_size=None, dry_run=False):
+    """ Makes ``model`` table contain objects with ids and titles given
+    as ``(id, title)`` tuples. Existing titles are read with one query,
+    new objects are bulk created and only changed titles are updated.
+    If ``dry_run`` is true, changes are only counted.
+
+    Returns ``(inserted, updated, unchanged)`` tuple.
+    """
+    manager = model.objects.using(using)
+    existing = dict(manager.filter(
+        id__in=[pk for pk, title in rows]).values_list('id', 'title'))
+    new = []
+    changed = []
+    for pk, title in rows:
+        if pk not in existing:
+            new.append(model(id=pk, title=title))
+        elif existing[pk] != title:
+            changed.append((pk, title))
+    if not dry_run:
+        manager.bulk_create(new, batch_size)
+        for pk, title in changed:
+            manager.filter(id=pk).update(title=title)
+    return len(new), len(changed), len(rows) - len(new) - len(changed)
+
+
+def import_sections_and_groups(rows, batch_size=None, dry_run=False):
+    """ Creates or renames sections and session groups with the same
+    ids and titles in one transaction.
+
+    Returns ``(inserted, updated, unchanged)`` tuples for sections and
+    for groups.
+    """
+    rows = [(int(row[u'id']), row[u'title']) for row in rows]
+    using = router.db_for_write(models.SessionGroup)
+    with transaction.atomic(using=using):
+        sections = upsert_titles(
+                Section, rows, using, batch_size, dry_run)
+        groups = upsert_titles(
+                models.SessionGroup, rows, using, batch_size, dry_run)
+    if not dry_run:
+        # Bulk writes send no signals.
+        cache.session_groups.invalidate()
+    return sections, groups
+
+
+def read_csv_rows(lines, columns, encoding='utf-8'):
+    """ Reads CSV file lazily and yields ``(row number, row)`` tuples.
+
+    The first line must contain captions: either column names or
+    their titles from ``columns`` dictionary. Data rows are numbered
+    from 1. Empty rows are skipped, but counted.
+    """
+    reader = csv.reader(lines)
+    try:
+        captions = next(reader)
+    except StopIteration:
+        return
+    keys = {}
+    for key, title in columns.items():
+        keys[key.lower()] = key
+        keys[unicode(title).lower()] = key
+    header = [
+            keys.get(caption.decode(encoding).lstrip(u'\ufeff')
+                     .strip().lower())
+            for caption in captions
+            ]
+    missing = [
+            unicode(title)
+            for key, title in columns.items()
+            if key not in header
+            ]
+    if missing:
+        raise ValidationError(
+                _(u'Missing columns: {0}.').format(u', '.join(missing)))
+    for number, cells in enumerate(reader, 1):
+        if not any(cell.strip() for cell in cells):
+            continue
+        row = dict.fromkeys(columns, u'')
+        for key, cell in zip(header, cells):
+            if key is not None:
+                row[key] = cell.decode(encoding).strip()
+        yield number, row
+
+
+def count_csv_rows(path):
+    """ Returns the number of data rows in CSV file.
+    """
+    with open(path, 'rb') as csv_file:
+        return max(sum(1 for cells in csv.reader(csv_file)) - 1, 0)
+
+
+def coerce_integer_columns(row, integer_columns):
+    """ Converts values of integer columns read from text file.
+    """
+    for key in integer_columns:
+        try:
+            row[key] = int(row[key])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                    _(u'Column \u201c{0}\u201d must contain an integer.'
+                        ).format(key))
+    return row
+
+
+def clean_numbered_rows(numbered_rows):
+    """ Cleans ``(row number, row)`` tuples with
+    :func:`forms.base_info_import_clean_row`.
+
+    Returns a list of ``(row number, row, error)`` tuples, where either
+    ``row`` or ``error`` message is ``None``. Does not touch database,
+    so it can be run in worker process.
+    """
+    results = []
+    for number, row in numbered_rows:
+        try:
+            row = coerce_integer_columns(row, (u'payment',))
+            row = forms.base_info_import_clean_row(row)
+        except ValidationError as e:
+            results.append((number, None, u' '.join(e.messages)))
+        else:
+            results.append((number, row, None))
+    return results
+
+
+class RowCleaner(object):
+    """ Cleans rows with :func:`clean_numbered_rows` either in the
+    current process or split across ``multiprocessing`` pool. Results
+    are always in the original row order.
+    """
+
+    def __init__(self, processes=1):
+        self.processes = processes
+        if processes > 1:
+            self._pool = multiprocessing.Pool(processes)
+        else:
+            self._pool = None
+
+    def clean(self, numbered_rows):
+        """ Returns the result of :func:`clean_numbered_rows`.
+        """
+        if self._pool is None:
+            return clean_numbered_rows(numbered_rows)
+        part_size = -(-len(numbered_rows) // self.processes)
+        results = []
+        for part in self._pool.map(
+                clean_numbered_rows,
+                list(iterate_batches(numbered_rows, part_size))):
+            results.extend(part)
+        return results
+
+    def close(self):
+        """ Stops worker processes.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+class StreamingImportResult(object):
+    """ Outcome of the streaming import.
+
+    ``checkpoint`` is the number of the last committed row. Import can
+    be resumed by passing it as ``start_row``. ``upserter`` is set only
+    in upsert mode.
+    """
+
+    def __init__(self, start_row):
+        self.checkpoint = start_row
+        self.imported = 0
+        self.errors = []
+        self.timings = []
+        self.upserter = None
+
+    @property
+    def failed(self):
+        """ True, if import stopped before the end of the file.
+        """
+        return bool(self.errors)
+
+
+def import_base_infos_streaming(numbered_rows, batch_size=None,
+                                start_row=0, upsert=False, processes=1,
+                                dry_run=False, progress=None):
+    """ Reads, validates and commits rows in chunks of ``batch_size``.
+
+    ``numbered_rows`` is an iterable of ``(row number, row)`` tuples,
+    for example, produced by :func:`read_csv_rows`. Rows with numbers
+    not greater than ``start_row`` are skipped. Import stops at the
+    first chunk, which contains invalid rows or fails to commit; all
+    previous chunks stay committed. If ``upsert`` is true, chunks are
+    written with :class:`BaseInfoUpserter`. If ``processes`` is greater
+    than 1, rows of every chunk are cleaned in parallel by a pool of
+    worker processes, while sections are still resolved in the current
+    process. The pool is meant for management commands only: forking
+    web server workers is unsafe and counters of memoised validators
+    are not updated by pool processes.
+
+    If ``dry_run`` is true, the whole input is validated and nothing is
+    written. ``progress``, if given, is called with the number of the
+    last processed row after every chunk.
+    """
+    sections = forms.SectionLookup()
+    result = StreamingImportResult(start_row)
+    if upsert:
+        result.upserter = BaseInfoUpserter(dry_run)
+    numbered_rows = (
+            (number, row)
+            for number, row in numbered_rows
+            if number > start_row)
+    cleaner = RowCleaner(processes)
+    try:
+        for chunk in iterate_batches(
+                numbered_rows, batch_size or IMPORT_BATCH_SIZE):
+            valid_rows = []
+            for number, row, error in cleaner.clean(chunk):
+                if error is None:
+                    try:
+                        row[u'section'] = sections.get(row[u'section'])
+                    except ValidationError as e:
+                        error = u' '.join(e.messages)
+                if error is None:
+                    valid_rows.append(row)
+                else:
+                    result.errors.append((number, error))
+            if dry_run:
+                if result.upserter is not None:
+                    result.upserter.apply(valid_rows)
+            else:
+                if result.errors:
+                    break
+                try:
+                    if result.upserter is not None:
+                        result.upserter.apply(valid_rows)
+                        result.timings.append(result.upserter.timings[-1])
+                    else:
+                        result.timings.extend(bulk_create_batches(
+                            models.BaseInfo,
+                            map(base_info_from_row, valid_rows),
+                            len(valid_rows)))
+                except DatabaseError as e:
+                    result.errors.append((chunk[0][0], unicode(e)))
+                    break
+                result.checkpoint = chunk[-1][0]
+            result.imported += len(valid_rows)
+            if progress is not None:
+                progress(chunk[-1][0])
+    finally:
+        cleaner.close()
+    return result
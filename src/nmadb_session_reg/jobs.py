@@ -0,0 +1,146 @@
+import datetime
+import json
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from nmadb_session_reg import models
+from nmadb_session_reg.importer import iterate_batches
+
+
+JOB_CHUNK_SIZE = getattr(settings, 'NMADB_SESSION_REG_JOB_CHUNK_SIZE', 200)
+
+JOB_STALE_AFTER = getattr(
+        settings, 'NMADB_SESSION_REG_JOB_STALE_AFTER', 3600)
+
+JOB_HEARTBEAT = getattr(settings, 'NMADB_SESSION_REG_JOB_HEARTBEAT', 60)
+
+HANDLERS = {}
+
+
+def register(action, finished=None):
+    """ Registers job handler for action. Handler is called with a
+    queryset of registration infos of one chunk and a callable, which
+    records a message. ``finished``, if given, is called with the job
+    after all chunks were processed successfully.
+    """
+    def decorator(handler):
+        HANDLERS[action] = (handler, finished)
+        return handler
+    return decorator
+
+
+def enqueue(action, queryset):
+    """ Creates a job for objects of the queryset.
+    """
+    if action not in HANDLERS:
+        raise KeyError(action)
+    # Taken before the selection is read, so that changes made while
+    # reading are not skipped by a synchronisation watermark.
+    selected = timezone.now()
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    return models.Job.objects.create(
+            action=action,
+            object_ids=json.dumps(ids),
+            total=len(ids),
+            selected=selected,
+            )
+
+
+def requeue_stale(stale_after=None):
+    """ Queues again running jobs, whose heartbeat is older than
+    ``stale_after`` seconds, because their worker died. They resume from
+    the last committed chunk. Returns the number of requeued jobs.
+    """
+    limit = timezone.now() - datetime.timedelta(
+            seconds=stale_after or JOB_STALE_AFTER)
+    using = router.db_for_write(models.Job)
+    return models.Job.objects.using(using).filter(
+            status=models.Job.RUNNING, heartbeat__lt=limit).update(
+                status=models.Job.QUEUED)
+
+
+def claim(stale_after=None):
+    """ Marks the oldest queued job as running and returns it or
+    ``None``. Stale running jobs are queued again first.
+    """
+    requeue_stale(stale_after)
+    using = router.db_for_write(models.Job)
+    with transaction.atomic(using=using):
+        job = models.Job.objects.using(using).select_for_update().filter(
+                status=models.Job.QUEUED).order_by('pk').first()
+        if job is not None:
+            job.status = models.Job.RUNNING
+            job.started = timezone.now()
+            job.save()
+    return job
+
+
+class Heartbeat(threading.Thread):
+    """ Refreshes the heartbeat of a running job every ``interval``
+    seconds. The thread has its own database connection, so updates are
+    committed while a long chunk is still in its transaction.
+    """
+
+    def __init__(self, job, interval=None):
+        super(Heartbeat, self).__init__()
+        self.daemon = True
+        self.job_id = job.pk
+        self.interval = interval or JOB_HEARTBEAT
+        self._stopped = threading.Event()
+
+    def run(self):
+        using = router.db_for_write(models.Job)
+        try:
+            while not self._stopped.wait(self.interval):
+                models.Job.objects.using(using).filter(
+                        pk=self.job_id).update(heartbeat=timezone.now())
+        finally:
+            connections[using].close()
+
+    def stop(self):
+        """ Stops refreshing and waits for the thread to finish.
+        """
+        self._stopped.set()
+        self.join()
+
+
+def run(job, chunk_size=None):
+    """ Processes the job chunk by chunk. Every chunk is committed and
+    progress is saved after it, so a failed job keeps the work done.
+    While the job runs, :class:`Heartbeat` refreshes its heartbeat every
+    ``JOB_HEARTBEAT`` seconds, therefore ``JOB_STALE_AFTER`` only has to
+    be longer than that interval, not than the slowest chunk.
+    """
+    handler, finished = HANDLERS[job.action]
+    ids = json.loads(job.object_ids)
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        for chunk in iterate_batches(
+                ids[job.processed:], chunk_size or JOB_CHUNK_SIZE):
+            messages = []
+            with transaction.atomic():
+                handler(
+                        models.RegistrationInfo.objects.filter(
+                            pk__in=chunk),
+                        messages.append)
+            job.processed += len(chunk)
+            job.messages += u''.join(
+                    u'{0}\n'.format(message) for message in messages)
+            job.save()
+        if finished is not None:
+            finished(job)
+    except Exception:
+        job.status = models.Job.FAILED
+        job.error = traceback.format_exc().decode('utf-8', 'replace')
+    else:
+        job.status = models.Job.DONE
+    finally:
+        heartbeat.stop()
+    job.finished = timezone.now()
+    job.save()
+    return job
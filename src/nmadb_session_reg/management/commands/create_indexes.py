@@ -0,0 +1,68 @@
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import get_app, get_models
+
+from nmadb_session_reg.management import schema
+
+
+class Command(NoArgsCommand):
+    """ Creates indexes declared on session registration models, which
+    are missing in the database.
+
+    Tables of this application are not managed by ``syncdb`` (see
+    :class:`nmadb_session_reg.router.SessionRegRouter`), so indexes
+    added to models have to be created in existing databases with this
+    command. Indexes, which already exist (checked by name through
+    database introspection), are left untouched; any error while
+    creating a missing index aborts the command.
+    """
+
+    help = 'Creates missing indexes of session registration models.'
+
+    option_list = NoArgsCommand.option_list + (
+            make_option(
+                '--dry-run',
+                action='store_true',
+                default=False,
+                help='Only print CREATE INDEX statements of missing '
+                'indexes.'),
+            )
+
+    def handle_noargs(self, **options):
+        created = 0
+        existing = 0
+        indexes = {}
+        for model in get_models(get_app('nmadb_session_reg')):
+            using = router.db_for_write(model)
+            connection = connections[using]
+            for sql in connection.creation.sql_indexes_for_model(
+                    model, no_style()):
+                parsed = schema.parse_index_sql(sql)
+                if parsed is None:
+                    raise CommandError(
+                            u'Unexpected index statement: {0}'.format(sql))
+                name, table = parsed
+                key = (using, table)
+                if key not in indexes:
+                    try:
+                        indexes[key] = schema.index_names(connection, table)
+                    except NotImplementedError as e:
+                        raise CommandError(unicode(e))
+                if name in indexes[key]:
+                    existing += 1
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(sql)
+                    continue
+                with transaction.atomic(using=using):
+                    connection.cursor().execute(sql)
+                indexes[key].add(name)
+                created += 1
+                self.stdout.write(u'Created: {0}'.format(sql))
+        if not options['dry_run']:
+            self.stdout.write(
+                    u'{0} indexes created, {1} already existed.'.format(
+                        created, existing))
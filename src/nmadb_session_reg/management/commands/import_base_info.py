@@ -0,0 +1,83 @@
+from optparse import make_option
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from nmadb_session_reg import forms, importer
+from nmadb_session_reg.management.progress import ProgressBar
+
+
+class Command(BaseCommand):
+    """ Imports base infos from CSV file.
+    """
+
+    args = '<file.csv>'
+    help = (
+            'Imports base infos from UTF-8 encoded CSV file with the same '
+            'validation as the admin import.')
+
+    option_list = BaseCommand.option_list + (
+            make_option(
+                '--batch-size',
+                type='int',
+                default=importer.IMPORT_BATCH_SIZE,
+                help='Number of rows validated and committed at once.'),
+            make_option(
+                '--start-row',
+                type='int',
+                default=0,
+                help='Skip rows up to the given (last committed) row.'),
+            make_option(
+                '--processes',
+                type='int',
+                default=importer.IMPORT_PROCESSES,
+                help='Number of processes used for row validation.'),
+            make_option(
+                '--upsert',
+                action='store_true',
+                default=False,
+                help='Update existing base infos instead of duplicating.'),
+            make_option(
+                '--dry-run',
+                action='store_true',
+                default=False,
+                help='Validate the whole file without writing anything.'),
+            )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Expected exactly one CSV file path.')
+        path = args[0]
+        progress = ProgressBar(self.stdout, importer.count_csv_rows(path))
+        with open(path, 'rb') as csv_file:
+            try:
+                result = importer.import_base_infos_streaming(
+                        importer.read_csv_rows(
+                            csv_file,
+                            forms.IMPORT_BASE_INFO_REQUIRED_COLUMNS),
+                        batch_size=options['batch_size'],
+                        start_row=options['start_row'],
+                        upsert=options['upsert'],
+                        processes=options['processes'],
+                        dry_run=options['dry_run'],
+                        progress=progress.update)
+            except ValidationError as e:
+                raise CommandError(u' '.join(e.messages))
+        progress.finish()
+        for number, error in result.errors:
+            self.stderr.write(u'Row {0}: {1}'.format(number, error))
+        if result.upserter is not None:
+            self.stdout.write(result.upserter.summary())
+        elif options['dry_run']:
+            self.stdout.write(
+                    u'{0} valid rows.'.format(result.imported))
+        else:
+            self.stdout.write(
+                    u'{0} base infos imported.'.format(result.imported))
+        if result.failed:
+            if options['dry_run']:
+                raise CommandError(u'Validation failed.')
+            raise CommandError(
+                    u'Import stopped. Rows up to {0} are committed; '
+                    u'rerun with --start-row={0}.'.format(
+                        result.checkpoint))
@@ -0,0 +1,64 @@
+from optparse import make_option
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext_lazy as _
+
+from nmadb_session_reg import importer
+from nmadb_session_reg.management.progress import ProgressBar
+
+
+SECTION_COLUMNS = {
+        u'id': _(u'Id'),
+        u'title': _(u'Title'),
+        }
+
+
+class Command(BaseCommand):
+    """ Imports sections and creates session groups from CSV file.
+    """
+
+    args = '<file.csv>'
+    help = (
+            'Imports sections and session groups from UTF-8 encoded CSV '
+            'file with id and title columns.')
+
+    option_list = BaseCommand.option_list + (
+            make_option(
+                '--batch-size',
+                type='int',
+                default=importer.IMPORT_BATCH_SIZE,
+                help='Number of rows inserted with one statement.'),
+            make_option(
+                '--dry-run',
+                action='store_true',
+                default=False,
+                help='Only report what would be changed.'),
+            )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Expected exactly one CSV file path.')
+        path = args[0]
+        progress = ProgressBar(self.stdout, importer.count_csv_rows(path))
+        rows = []
+        with open(path, 'rb') as csv_file:
+            try:
+                for number, row in importer.read_csv_rows(
+                        csv_file, SECTION_COLUMNS):
+                    rows.append(row)
+                    progress.update(number)
+            except ValidationError as e:
+                raise CommandError(u' '.join(e.messages))
+        progress.finish()
+        try:
+            sections, groups = importer.import_sections_and_groups(
+                    rows, options['batch_size'], options['dry_run'])
+        except ValueError:
+            raise CommandError(u'Section ids must be integers.')
+        self.stdout.write(
+                u'Sections: {0} created, {1} renamed, {2} '
+                u'unchanged.'.format(*sections))
+        self.stdout.write(
+                u'Groups: {0} created, {1} renamed, {2} '
+                u'unchanged.'.format(*groups))
@@ -0,0 +1,18 @@
+from django.core.management.base import NoArgsCommand, CommandError
+
+from nmadb_session_reg import models
+from nmadb_session_reg.config import info
+
+
+class Command(NoArgsCommand):
+    """ Recomputes denormalised top selections from all ratings.
+    """
+
+    help = 'Recomputes top selections of all students from ratings.'
+
+    def handle_noargs(self, **options):
+        if not info.session_is_program_based:
+            raise CommandError(u'Session is not program based.')
+        models.TopSelection.objects.rebuild()
+        self.stdout.write(u'{0} top selections rebuilt.'.format(
+            models.TopSelection.objects.count()))
@@ -0,0 +1,52 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from nmadb_session_reg import jobs
+
+
+class Command(NoArgsCommand):
+    """ Worker, which processes queued jobs.
+    """
+
+    help = 'Processes jobs queued by the registration admin actions.'
+
+    option_list = NoArgsCommand.option_list + (
+            make_option(
+                '--once',
+                action='store_true',
+                default=False,
+                help='Exit when there are no queued jobs.'),
+            make_option(
+                '--sleep',
+                type='float',
+                default=5,
+                help='Seconds to wait for new jobs.'),
+            make_option(
+                '--stale-after',
+                type='int',
+                default=jobs.JOB_STALE_AFTER,
+                help='Seconds without a heartbeat after which a running '
+                'job is considered abandoned and queued again.'),
+            make_option(
+                '--chunk-size',
+                type='int',
+                default=jobs.JOB_CHUNK_SIZE,
+                help='Number of registrations committed at once.'),
+            )
+
+    def handle_noargs(self, **options):
+        # Job handlers are registered together with the admin actions.
+        import nmadb_session_reg.admin
+        while True:
+            job = jobs.claim(options['stale_after'])
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            self.stdout.write(u'Started job {0}.'.format(job))
+            jobs.run(job, options['chunk_size'])
+            self.stdout.write(u'Job {0} {1}.'.format(
+                job, job.get_status_display()))
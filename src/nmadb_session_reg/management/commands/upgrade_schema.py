@@ -0,0 +1,102 @@
+from optparse import make_option
+
+from django.core.management import call_command
+from django.core.management.base import NoArgsCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import get_app, get_models
+from django.utils import timezone
+
+from nmadb_session_reg.management import schema
+
+
+class Command(NoArgsCommand):
+    """ Creates tables and columns of session registration models, which
+    are missing in the database, and then their indexes.
+
+    Tables of this application are not managed by ``syncdb`` (see
+    :class:`nmadb_session_reg.router.SessionRegRouter`), so tables and
+    fields added to models (for example, ``TopSelection``, ``Job``,
+    ``SyncWatermark``, ``SessionProgram.capacity``, ``Info.version`` and
+    ``modified_timestamp`` of student and parent infos) have to be
+    created in existing databases with this command. Existing rows get
+    the field default; ``auto_now`` and ``auto_now_add`` dates are set
+    to the current time. Run with ``--dry-run`` to get the SQL.
+    """
+
+    help = 'Creates missing tables, columns and indexes.'
+
+    option_list = NoArgsCommand.option_list + (
+            make_option(
+                '--dry-run',
+                action='store_true',
+                default=False,
+                help='Only print the SQL statements.'),
+            )
+
+    def default_sql(self, connection, field, now):
+        """ Returns SQL literal of the value for existing rows.
+        """
+        if getattr(field, 'auto_now', False) or getattr(
+                field, 'auto_now_add', False):
+            value = now
+        elif field.has_default():
+            value = field.get_default()
+        else:
+            raise CommandError(
+                    u'Cannot add NOT NULL column {0} without a default.'
+                    .format(field))
+        value = field.get_db_prep_save(value, connection=connection)
+        if isinstance(value, bool):
+            return unicode(int(value))
+        if isinstance(value, (int, long, float)):
+            return unicode(value)
+        return u"'{0}'".format(unicode(value).replace(u"'", u"''"))
+
+    def add_column_sql(self, connection, model, field, now):
+        """ Returns ``ALTER TABLE`` statement, which adds the field.
+        """
+        qn = connection.ops.quote_name
+        sql = u'ALTER TABLE {0} ADD COLUMN {1} {2}'.format(
+                qn(model._meta.db_table),
+                qn(field.column),
+                field.db_type(connection=connection))
+        if field.null:
+            return sql + u' NULL;'
+        return sql + u' DEFAULT {0} NOT NULL;'.format(
+                self.default_sql(connection, field, now))
+
+    def handle_noargs(self, **options):
+        now = timezone.now()
+        known_models = set(get_models(include_auto_created=True))
+        statements = []
+        for model in get_models(get_app('nmadb_session_reg')):
+            if not model._meta.managed or model._meta.proxy:
+                continue
+            using = router.db_for_write(model)
+            connection = connections[using]
+            table = model._meta.db_table
+            if table not in schema.table_names(connection):
+                sql, pending = connection.creation.sql_create_model(
+                        model, no_style(), known_models)
+                statements.extend((using, statement) for statement in sql)
+                continue
+            columns = schema.column_names(connection, table)
+            for field in model._meta.local_fields:
+                if field.column not in columns:
+                    statements.append((using, self.add_column_sql(
+                        connection, model, field, now)))
+        for using, sql in statements:
+            if options['dry_run']:
+                self.stdout.write(sql)
+                continue
+            with transaction.atomic(using=using):
+                connections[using].cursor().execute(sql)
+            self.stdout.write(u'Executed: {0}'.format(sql))
+        if not options['dry_run']:
+            self.stdout.write(
+                    u'{0} statements executed.'.format(len(statements)))
+            call_command('create_indexes', stdout=self.stdout)
+        elif statements:
+            self.stdout.write(
+                    u'Run create_indexes after applying these statements.')
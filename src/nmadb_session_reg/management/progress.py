@@ -0,0 +1,28 @@
+class ProgressBar(object):
+    """ Text progress bar for management commands.
+    """
+
+    def __init__(self, stream, total, width=40):
+        self.stream = stream
+        self.total = total
+        self.width = width
+
+    def update(self, done):
+        """ Redraws the bar to show that ``done`` items are processed.
+        """
+        if self.total:
+            fraction = min(float(done) / self.total, 1.0)
+        else:
+            fraction = 1.0
+        filled = int(round(self.width * fraction))
+        self.stream.write(
+                u'\r[{0}{1}] {2}/{3}'.format(
+                    u'#' * filled, u'.' * (self.width - filled),
+                    done, self.total),
+                ending=u'')
+        self.stream.flush()
+
+    def finish(self):
+        """ Moves the cursor below the bar.
+        """
+        self.stream.write(u'')
@@ -0,0 +1,62 @@
+import re
+
+
+INDEX_SQL = re.compile(
+        r'^CREATE (?:UNIQUE )?INDEX ([^ ]+) ON ([^ ]+)', re.IGNORECASE)
+
+INDEX_NAMES_SQL = {
+        'sqlite': (
+            'SELECT name FROM sqlite_master '
+            'WHERE type = \'index\' AND tbl_name = %s'),
+        'postgresql': (
+            'SELECT indexname FROM pg_indexes WHERE tablename = %s'),
+        }
+
+
+def unquote(name):
+    """ Strips identifier quotes of all supported backends.
+    """
+    return name.strip(u'"`[]')
+
+
+def parse_index_sql(sql):
+    """ Returns ``(index name, table name)`` of ``CREATE INDEX``
+    statement or ``None``.
+    """
+    match = INDEX_SQL.match(sql.strip())
+    if match is None:
+        return None
+    return unquote(match.group(1)), unquote(match.group(2))
+
+
+def index_names(connection, table):
+    """ Returns the set of index names of the table.
+    """
+    cursor = connection.cursor()
+    if connection.vendor == 'mysql':
+        quoted = connection.ops.quote_name(table)
+        cursor.execute('SHOW INDEX FROM {0}'.format(quoted))
+        return set(row[2] for row in cursor.fetchall())
+    try:
+        sql = INDEX_NAMES_SQL[connection.vendor]
+    except KeyError:
+        raise NotImplementedError(
+                u'Index introspection is not supported for {0}.'.format(
+                    connection.vendor))
+    cursor.execute(sql, [table])
+    return set(row[0] for row in cursor.fetchall())
+
+
+def table_names(connection):
+    """ Returns the set of table names of the database.
+    """
+    return set(connection.introspection.table_names())
+
+
+def column_names(connection, table):
+    """ Returns the set of column names of the table.
+    """
+    return set(
+            column[0]
+            for column in connection.introspection.get_table_description(
+                connection.cursor(), table))
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils.translation import ugettext_lazy as _
 from django.core import validators
 
@@ -22,6 +22,7 @@ class BaseInfo(models.Model):
     email = models.EmailField(
             max_length=128,
             verbose_name=_(u'email address'),
+            db_index=True,
             )
 
     human_id = models.IntegerField(        # Human.id from NMADB.
@@ -57,6 +58,7 @@ class BaseInfo(models.Model):
 
     class Meta(object):
         ordering = [u'last_name', u'first_name']
+        index_together = [[u'last_name', u'first_name']]
         verbose_name = _(u'base info')
         verbose_name_plural = _(u'base infos')
 
@@ -64,6 +66,18 @@ class BaseInfo(models.Model):
         return u'<{0.id}> {0.first_name} {0.last_name}'.format(self)
 
 
+class InvitationManager(models.Manager):
+    """ Manager for invitations.
+    """
+
+    def for_registration(self):
+        """ Returns invitations with base info, section and, if student
+        is already registered, student info fetched in one query.
+        """
+        return self.get_queryset().select_related(
+                'base__section', 'student_info')
+
+
 class Invitation(models.Model):
     """ Invitation to session. This table is created, when invitation
     email is sent to pupil.
@@ -75,7 +89,9 @@ class Invitation(models.Model):
             )
 
     uuid = utils_models.UUIDField(
-            verbose_name=_(u'invitation identifier'))
+            verbose_name=_(u'invitation identifier'),
+            db_index=True,
+            )
 
     payment = models.IntegerField(
             verbose_name=_(u'participant\'s payment'),
@@ -92,6 +108,8 @@ class Invitation(models.Model):
             null=True,
             )
 
+    objects = InvitationManager()
+
     class Meta(object):
         ordering = [u'base',]
         verbose_name = _(u'invitation')
@@ -167,8 +185,15 @@ class StudentInfo(models.Model):
             auto_now_add=True,
             )
 
+    modified_timestamp = models.DateTimeField(
+            verbose_name=_(u'modified timestamp'),
+            auto_now=True,
+            db_index=True,
+            )
+
     class Meta(object):
         ordering = [u'invitation',]
+        index_together = [[u'last_name', u'first_name']]
         verbose_name = _(u'student info')
         verbose_name_plural = _(u'student infos')
 
@@ -214,6 +239,7 @@ if info.session_is_program_based:
     from nmadb_session_reg.models.program_based import (
             SessionProgram,
             SessionProgramRating,
+            TopSelection,
             )
     from nmadb_session_reg.models import program_based
     class RegistrationInfo(
@@ -230,6 +256,8 @@ if info.session_is_program_based:
                 blank=True,
                 null=True,
                 )
+
+        objects = program_based.RegistrationInfoManager()
 else:
     from nmadb_session_reg.models.section_based import (
             SessionGroup,
@@ -287,8 +315,15 @@ class ParentInfo(models.Model):
             null=True,
             )
 
+    modified_timestamp = models.DateTimeField(
+            verbose_name=_(u'modified timestamp'),
+            auto_now=True,
+            db_index=True,
+            )
+
     class Meta(object):
         ordering = [u'last_name', u'first_name',]
+        index_together = [[u'last_name', u'first_name']]
         verbose_name = _(u'parent info')
         verbose_name_plural = _(u'parent infos')
 
@@ -352,3 +387,144 @@ class Info(models.Model):
     root_page_redirect_address = models.URLField(
             verbose_name=_(u'root page redirect address'),
             )
+
+    version = models.PositiveIntegerField(
+            verbose_name=_(u'version'),
+            editable=False,
+            default=0,
+            )
+
+    def save(self, *args, **kwargs):
+        """ Bumps version, so that cached copies get reloaded. The
+        version is incremented in the database and never written from
+        the instance, so that concurrent saves do not lose a bump.
+        """
+        using = kwargs.get('using') or router.db_for_write(
+                Info, instance=self)
+        if not self._state.adding and 'update_fields' not in kwargs:
+            kwargs['update_fields'] = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'version']
+        with transaction.atomic(using=using):
+            super(Info, self).save(*args, **kwargs)
+            versions = Info.objects.using(using).filter(pk=self.pk)
+            versions.update(version=models.F('version') + 1)
+            self.version = versions.values_list('version', flat=True)[0]
+
+
+class Job(models.Model):
+    """ Long running action, which is processed by the ``run_jobs``
+    worker in committed chunks.
+    """
+
+    QUEUED = u'Q'
+    RUNNING = u'R'
+    DONE = u'D'
+    FAILED = u'F'
+
+    STATUS = (
+            (QUEUED, _(u'queued')),
+            (RUNNING, _(u'running')),
+            (DONE, _(u'done')),
+            (FAILED, _(u'failed')),
+            )
+
+    action = models.CharField(
+            max_length=64,
+            verbose_name=_(u'action'),
+            )
+
+    status = models.CharField(
+            max_length=1,
+            choices=STATUS,
+            default=QUEUED,
+            db_index=True,
+            verbose_name=_(u'status'),
+            )
+
+    object_ids = models.TextField(
+            verbose_name=_(u'object ids'),
+            help_text=_(u'JSON list of processed object ids.'),
+            )
+
+    total = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'total'),
+            )
+
+    processed = models.PositiveIntegerField(
+            default=0,
+            verbose_name=_(u'processed'),
+            )
+
+    messages = models.TextField(
+            blank=True,
+            verbose_name=_(u'messages'),
+            )
+
+    error = models.TextField(
+            blank=True,
+            verbose_name=_(u'error'),
+            )
+
+    created = models.DateTimeField(
+            auto_now_add=True,
+            verbose_name=_(u'created'),
+            )
+
+    selected = models.DateTimeField(
+            verbose_name=_(u'selected'),
+            help_text=_(u'Time just before the object ids were read.'),
+            )
+
+    started = models.DateTimeField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'started'),
+            )
+
+    finished = models.DateTimeField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'finished'),
+            )
+
+    heartbeat = models.DateTimeField(
+            auto_now=True,
+            db_index=True,
+            verbose_name=_(u'heartbeat'),
+            help_text=_(u'Time of the last progress save.'),
+            )
+
+    def progress(self):
+        """ Returns progress in percents.
+        """
+        if not self.total:
+            return 100
+        return self.processed * 100 // self.total
+    progress.short_description = _(u'progress (%)')
+
+    def __unicode__(self):
+        return u'{0.id} {0.action} ({0.processed}/{0.total})'.format(self)
+
+
+class SyncWatermark(models.Model):
+    """ Time up to which changes were synchronised.
+    """
+
+    name = models.CharField(
+            max_length=64,
+            unique=True,
+            verbose_name=_(u'name'),
+            )
+
+    timestamp = models.DateTimeField(
+            verbose_name=_(u'timestamp'),
+            )
+
+    def __unicode__(self):
+        return u'{0.name} {0.timestamp}'.format(self)
+
+
+from nmadb_session_reg import signals
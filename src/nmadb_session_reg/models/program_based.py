@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 
 from nmadb_session_reg.models import StudentInfo
 from django.utils.translation import ugettext_lazy as _
@@ -20,6 +20,15 @@ class SessionProgram(models.Model):
             verbose_name=_(u'description'),
             )
 
+    capacity = models.PositiveIntegerField(
+            blank=True,
+            null=True,
+            verbose_name=_(u'capacity'),
+            help_text=_(
+                u'Maximum number of assigned students. Empty means '
+                u'unlimited.'),
+            )
+
     ratings = models.ManyToManyField(
             StudentInfo,
             through='SessionProgramRating',
@@ -37,6 +46,64 @@ class SessionProgram(models.Model):
         return self.title
 
 
+def attach_top_selections(registration_infos, count):
+    """ Attaches ``count`` highest rated programs to every registration
+    info. Ratings of all given registration infos are fetched with one
+    query.
+    """
+    registration_infos = dict(
+            (registration_info.pk, registration_info)
+            for registration_info in registration_infos)
+    for registration_info in registration_infos.values():
+        registration_info.top_selections = []
+        registration_info.top_selections_count = count
+    ratings = SessionProgramRating.objects.filter(
+            student__in=registration_infos.keys()
+            ).select_related('program').order_by('student__id', '-rating')
+    for rating in ratings:
+        selections = registration_infos[rating.student_id].top_selections
+        if len(selections) < count:
+            selections.append(rating)
+
+
+class RegistrationInfoQuerySet(models.query.QuerySet):
+    """ Query set of program based registration infos.
+    """
+
+    top_selections_count = None
+
+    def with_top_selections(self, count=3):
+        """ Attaches ``count`` highest rated programs to every fetched
+        registration info.
+        """
+        return self._clone(top_selections_count=count)
+
+    def _clone(self, klass=None, setup=False, **kwargs):
+        kwargs.setdefault('top_selections_count', self.top_selections_count)
+        return super(RegistrationInfoQuerySet, self)._clone(
+                klass, setup, **kwargs)
+
+    def _fetch_all(self):
+        fetched = self._result_cache is not None
+        super(RegistrationInfoQuerySet, self)._fetch_all()
+        if not fetched and self.top_selections_count:
+            attach_top_selections(
+                    self._result_cache, self.top_selections_count)
+
+
+class RegistrationInfoManager(models.Manager):
+    """ Manager of program based registration infos.
+    """
+
+    def get_queryset(self):
+        return RegistrationInfoQuerySet(self.model, using=self._db)
+
+    def with_top_selections(self, count=3):
+        """ See :meth:`RegistrationInfoQuerySet.with_top_selections`.
+        """
+        return self.get_queryset().with_top_selections(count)
+
+
 class RegistrationInfoMixin(models.Model):
     """ Information entered by administrator. Session is program
     based.
@@ -60,10 +127,16 @@ class RegistrationInfoMixin(models.Model):
         return u'<{0.id}> invitation: {0.invitation}'.format(self)
 
     def selection(self, index):
-        """ Student selection with given index.
+        """ Student selection with given index. Uses selections attached
+        by :meth:`RegistrationInfoQuerySet.with_top_selections`, if
+        they are available.
         """
-        ratings = SessionProgramRating.objects.filter(
-                student=self).order_by('-rating')
+        if index < getattr(self, 'top_selections_count', 0):
+            ratings = self.top_selections
+        else:
+            ratings = SessionProgramRating.objects.filter(
+                    student=self).select_related('program').order_by(
+                            '-rating')
         try:
             rating = ratings[index]
         except IndexError:
@@ -76,16 +149,22 @@ class RegistrationInfoMixin(models.Model):
         """ Session program that student assigned a highest rating.
         """
         return self.selection(0)
+    first_selection.admin_order_field = (
+            'top_selection__first_program__title')
 
     def second_selection(self):
         """ Session program that student assigned a second highest rating.
         """
         return self.selection(1)
+    second_selection.admin_order_field = (
+            'top_selection__second_program__title')
 
     def third_selection(self):
         """ Session program that student assigned a third highest rating.
         """
         return self.selection(2)
+    third_selection.admin_order_field = (
+            'top_selection__third_program__title')
 
 
 class SessionProgramRating(models.Model):
@@ -117,6 +196,129 @@ class SessionProgramRating(models.Model):
 
     class Meta(object):
         ordering = [u'student', u'program',]
+        index_together = [[u'student', u'rating']]
         verbose_name = u'session program rating'
         verbose_name_plural = u'session program ratings'
         app_label = 'nmadb_session_reg'
+
+
+class TopSelectionManager(models.Manager):
+    """ Manager that keeps top selections in sync with ratings.
+    """
+
+    def _create(self, ratings, using):
+        """ Creates top selections from ``(student id, program id,
+        rating)`` tuples ordered by student id and descending rating.
+        Ordering by ``student`` would follow the name ordering of
+        students and could mix ratings of namesakes.
+        """
+        selections = []
+        places = []
+        for student_id, program_id, rating in ratings:
+            if not selections or selections[-1].student_id != student_id:
+                selections.append(TopSelection(student_id=student_id))
+                places = list(TopSelection.PLACES)
+            if places:
+                place = places.pop(0)
+                setattr(selections[-1], place + '_program_id', program_id)
+                setattr(selections[-1], place + '_rating', rating)
+        self.db_manager(using).bulk_create(selections, batch_size=500)
+
+    def refresh(self, student_ids):
+        """ Recomputes top selections of the given students.
+        """
+        student_ids = list(student_ids)
+        using = router.db_for_write(TopSelection)
+        with transaction.atomic(using=using):
+            self.db_manager(using).filter(
+                    student__in=student_ids).delete()
+            self._create(
+                    SessionProgramRating.objects.db_manager(using).filter(
+                        student__in=student_ids).order_by(
+                            'student__id', '-rating').values_list(
+                                'student_id', 'program_id', 'rating'),
+                    using)
+
+    def rebuild(self):
+        """ Recomputes top selections of all students.
+        """
+        using = router.db_for_write(TopSelection)
+        with transaction.atomic(using=using):
+            self.db_manager(using).all().delete()
+            self._create(
+                    SessionProgramRating.objects.db_manager(using).order_by(
+                        'student__id', '-rating').values_list(
+                            'student_id', 'program_id', 'rating'),
+                    using)
+
+
+class TopSelection(models.Model):
+    """ Three highest rated programs of the student. Denormalised copy
+    of :class:`SessionProgramRating` used for filtering and sorting
+    registrations by choice.
+    """
+
+    PLACES = ('first', 'second', 'third')
+
+    student = models.OneToOneField(
+            StudentInfo,
+            primary_key=True,
+            related_name='top_selection',
+            verbose_name=_(u'student'),
+            )
+
+    first_program = models.ForeignKey(
+            SessionProgram,
+            related_name='+',
+            blank=True,
+            null=True,
+            verbose_name=_(u'first selection'),
+            )
+
+    first_rating = models.PositiveSmallIntegerField(
+            blank=True,
+            null=True,
+            db_index=True,
+            verbose_name=_(u'first selection rating'),
+            )
+
+    second_program = models.ForeignKey(
+            SessionProgram,
+            related_name='+',
+            blank=True,
+            null=True,
+            verbose_name=_(u'second selection'),
+            )
+
+    second_rating = models.PositiveSmallIntegerField(
+            blank=True,
+            null=True,
+            db_index=True,
+            verbose_name=_(u'second selection rating'),
+            )
+
+    third_program = models.ForeignKey(
+            SessionProgram,
+            related_name='+',
+            blank=True,
+            null=True,
+            verbose_name=_(u'third selection'),
+            )
+
+    third_rating = models.PositiveSmallIntegerField(
+            blank=True,
+            null=True,
+            db_index=True,
+            verbose_name=_(u'third selection rating'),
+            )
+
+    objects = TopSelectionManager()
+
+    class Meta(object):
+        ordering = [u'student']
+        verbose_name = _(u'top selection')
+        verbose_name_plural = _(u'top selections')
+        app_label = 'nmadb_session_reg'
+
+    def __unicode__(self):
+        return u'<{0.student_id}> {0.first_program_id}'.format(self)
@@ -0,0 +1,84 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from nmadb_registration.models import Section, School, Address
+from nmadb_session_reg import cache
+from nmadb_session_reg.config import info
+# This module is imported at the end of ``nmadb_session_reg.models``,
+# therefore concrete models are imported by name: on Python 2 the
+# half-initialised package can not be imported as a whole.
+from nmadb_session_reg.models import Info, StudentInfo
+
+
+@receiver(
+        post_save,
+        sender=Info,
+        dispatch_uid='nmadb-session-reg-info-cache')
+def invalidate_info(sender, **kwargs):
+    """ Makes the changed info visible in this process immediately.
+    """
+    info.invalidate()
+
+
+@receiver(
+        [post_save, post_delete],
+        sender=School,
+        dispatch_uid='nmadb-session-reg-school-index')
+def invalidate_school_index(sender, **kwargs):
+    """ Bumps version of the cached school index.
+    """
+    cache.school_index.invalidate()
+
+
+@receiver(
+        post_save,
+        sender=Address,
+        dispatch_uid='nmadb-session-reg-address-modified')
+def touch_address_owners(sender, instance, **kwargs):
+    """ Marks students living at the changed address as modified.
+    """
+    StudentInfo.objects.filter(home_address=instance).update(
+            modified_timestamp=timezone.now())
+
+
+if info.session_is_program_based:
+    from nmadb_session_reg.models import (
+            SessionProgram,
+            SessionProgramRating,
+            TopSelection,
+            )
+
+    @receiver(
+            [post_save, post_delete],
+            sender=SessionProgramRating,
+            dispatch_uid='nmadb-session-reg-top-selection')
+    def update_top_selection(sender, instance, **kwargs):
+        """ Recomputes top selections of the student, whose rating was
+        changed.
+        """
+        TopSelection.objects.refresh([instance.student_id])
+
+    @receiver(
+            [post_save, post_delete],
+            sender=SessionProgram,
+            dispatch_uid='nmadb-session-reg-program-catalog')
+    def invalidate_program_catalog(sender, **kwargs):
+        """ Bumps version of the cached program catalog.
+        """
+        cache.program_catalog.invalidate()
+else:
+    from nmadb_session_reg.models import SessionGroup
+
+    @receiver(
+            [post_save, post_delete],
+            sender=SessionGroup,
+            dispatch_uid='nmadb-session-reg-session-group-cache')
+    @receiver(
+            [post_save, post_delete],
+            sender=Section,
+            dispatch_uid='nmadb-session-reg-section-cache')
+    def invalidate_session_groups(sender, **kwargs):
+        """ Bumps version of the cached session groups of sections.
+        """
+        cache.session_groups.invalidate()
@@ -0,0 +1,75 @@
+/* School autocomplete for SchoolAutocompleteWidget.
+ *
+ * Suggestions are requested from the autocomplete view after the user
+ * stops typing for DELAY milliseconds. The chosen school id is copied
+ * to the hidden input, which is submitted with the form.
+ */
+(function () {
+    'use strict';
+
+    var DELAY = 300,
+        MIN_LENGTH = 2;
+
+    function setUp(title) {
+        var id = document.getElementById(
+                title.getAttribute('data-id-input')),
+            list = document.getElementById(title.getAttribute('list')),
+            url = title.getAttribute('data-url'),
+            timer = null,
+            pending = null;
+
+        function choose() {
+            var i;
+            id.value = '';
+            for (i = 0; i < list.options.length; i++) {
+                if (list.options[i].value === title.value) {
+                    id.value = list.options[i].getAttribute('data-id');
+                    return true;
+                }
+            }
+            return false;
+        }
+
+        function search() {
+            var request = new XMLHttpRequest();
+            if (pending !== null) {
+                pending.abort();
+            }
+            pending = request;
+            request.open(
+                'GET', url + '?q=' + encodeURIComponent(title.value));
+            request.onload = function () {
+                var schools = JSON.parse(request.responseText),
+                    option,
+                    i;
+                pending = null;
+                list.innerHTML = '';
+                for (i = 0; i < schools.length; i++) {
+                    option = document.createElement('option');
+                    option.value = schools[i].title;
+                    option.setAttribute('data-id', schools[i].id);
+                    list.appendChild(option);
+                }
+                choose();
+            };
+            request.send();
+        }
+
+        title.addEventListener('input', function () {
+            clearTimeout(timer);
+            if (choose() || title.value.trim().length < MIN_LENGTH) {
+                return;
+            }
+            timer = setTimeout(search, DELAY);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var inputs = document.querySelectorAll(
+                'input[data-school-autocomplete]'),
+            i;
+        for (i = 0; i < inputs.length; i++) {
+            setUp(inputs[i]);
+        }
+    });
+}());
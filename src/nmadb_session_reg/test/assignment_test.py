@@ -0,0 +1,87 @@
+#!/usr/bin/python
+
+
+import itertools
+import random
+import unittest
+
+from nmadb_session_reg.assignment import solve_assignment
+
+
+def score(preferences, assignment):
+    """ Returns number of assigned students and sum of their ratings.
+    """
+    assigned = [
+            (student, program)
+            for student, program in assignment.items()
+            if program is not None]
+    return (
+            len(assigned),
+            sum(preferences[student][program]
+                for student, program in assigned))
+
+
+def brute_force_score(preferences, capacities):
+    """ Finds the best score by checking all assignments.
+    """
+    students = sorted(preferences)
+    best = None
+    for programs in itertools.product(*[
+            [None] + list(preferences[student])
+            for student in students]):
+        loads = dict((program, programs.count(program))
+                     for program in capacities)
+        if any(capacity is not None and loads[program] > capacity
+               for program, capacity in capacities.items()):
+            continue
+        current = score(preferences, dict(zip(students, programs)))
+        if best is None or current > best:
+            best = current
+    return best
+
+
+class AssignmentSolverTest(unittest.TestCase):
+    """ Tests for program assignment solver.
+    """
+
+    def test_respects_capacity(self):
+        preferences = {
+                1: {u'a': 2, u'b': 1},
+                2: {u'a': 2, u'b': 1},
+                3: {u'a': 1, u'b': 2},
+                }
+        assignment = solve_assignment(preferences, {u'a': 1, u'b': 2})
+        self.assertEqual(
+                sorted(assignment.values()), [u'a', u'b', u'b'])
+        self.assertEqual(assignment[3], u'b')
+
+    def test_prefers_assigning_more_students(self):
+        preferences = {
+                1: {u'a': 10, u'b': 1},
+                2: {u'a': 1},
+                }
+        assignment = solve_assignment(preferences, {u'a': 1, u'b': 1})
+        self.assertEqual(assignment, {1: u'b', 2: u'a'})
+
+    def test_leaves_students_without_place(self):
+        preferences = {1: {u'a': 1}, 2: {u'a': 2}, 3: {}}
+        assignment = solve_assignment(preferences, {u'a': 1})
+        self.assertEqual(assignment, {1: None, 2: u'a', 3: None})
+
+    def test_optimal_on_random_instances(self):
+        rng = random.Random(2013)
+        for i in range(200):
+            programs = range(rng.randint(1, 4))
+            capacities = dict(
+                    (program, rng.choice((0, 1, 2, None)))
+                    for program in programs)
+            preferences = {}
+            for student in range(rng.randint(1, 6)):
+                rated = rng.sample(programs, rng.randint(0, len(programs)))
+                preferences[student] = dict(zip(
+                    rated, rng.sample(range(1, len(programs) + 1),
+                                      len(rated))))
+            assignment = solve_assignment(preferences, capacities)
+            self.assertEqual(
+                    score(preferences, assignment),
+                    brute_force_score(preferences, capacities))
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+
+
+from django.test import TestCase
+
+from nmadb_registration import models as registration_models
+from nmadb_session_reg import models, testing
+from nmadb_session_reg.router import DATABASE_NAME
+
+
+def setup_module():
+    global DATABASES
+    DATABASES = testing.setup_databases()
+
+
+def teardown_module():
+    testing.teardown_databases(DATABASES)
+
+
+class InvitationLoaderTest(TestCase):
+    """ Tests, that the registration view loads invitation with base
+    info, section and student info in one query.
+    """
+
+    multi_db = True
+
+    def setUp(self):
+        self.section = registration_models.Section.objects.create(
+                title=u'Fizika')
+        self.base_info = models.BaseInfo.objects.create(
+                first_name=u'Jonas',
+                last_name=u'Jonaitis',
+                email=u'jonas@example.com',
+                section=self.section,
+                payment=0,
+                )
+        self.invitation = models.Invitation.objects.create(
+                base=self.base_info,
+                payment=0,
+                )
+
+    def load(self):
+        """ Loads invitation and touches everything register view does.
+        """
+        invitation = models.Invitation.objects.for_registration().get(
+                uuid=self.invitation.uuid)
+        section = invitation.base.section
+        try:
+            student_info = invitation.student_info
+        except models.StudentInfo.DoesNotExist:
+            student_info = None
+        return section, student_info
+
+    def test_not_registered(self):
+        with self.assertNumQueries(1, using=DATABASE_NAME):
+            section, student_info = self.load()
+        self.assertEqual(section.title, u'Fizika')
+        self.assertIsNone(student_info)
+
+    def test_registered(self):
+        school = registration_models.School.objects.create(
+                title=u'Vilniaus lic\u0117jus')
+        models.StudentInfo.objects.create(
+                invitation=self.invitation,
+                first_name=u'Jonas',
+                last_name=u'Jonaitis',
+                email=u'jonas@example.com',
+                phone_number=u'+37060000000',
+                school_class=10,
+                school_year=2013,
+                school=school,
+                )
+        with self.assertNumQueries(1, using=DATABASE_NAME):
+            section, student_info = self.load()
+        self.assertEqual(section.title, u'Fizika')
+        self.assertEqual(student_info.first_name, u'Jonas')
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+
+import unittest
+
+from nmadb_session_reg.cache import SchoolIndex, fold_title
+
+
+SCHOOLS = (
+        (1, u'Vilniaus \u017dirm\u016bn\u0173 gimnazija'),
+        (2, u'Kauno \u0160ilo pagrindin\u0117 mokykla'),
+        (3, u'\u0160iauli\u0173 gimnazija'),
+        (4, u'Vilniaus lic\u0117jus'),
+        )
+
+
+class SchoolIndexTest(unittest.TestCase):
+    """ Tests for school autocomplete index.
+    """
+
+    def setUp(self):
+        self.index = SchoolIndex(SCHOOLS)
+
+    def test_fold_title(self):
+        self.assertEqual(
+                fold_title(u'  \u0160iauli\u0173   Gimnazija '),
+                u'siauliu gimnazija')
+
+    def test_prefix_without_diacritics(self):
+        self.assertEqual(
+                [pk for pk, title in self.index.search(u'ziRmu')], [1])
+
+    def test_prefix_with_diacritics(self):
+        self.assertEqual(
+                sorted(pk for pk, title in self.index.search(u'\u0161i')),
+                [2, 3])
+
+    def test_word_prefix(self):
+        self.assertEqual(
+                sorted(pk for pk, title in self.index.search(u'gimn')),
+                [1, 3])
+        self.assertEqual(
+                sorted(pk for pk, title in self.index.search(u'vilniaus')),
+                [1, 4])
+
+    def test_empty_query_and_limit(self):
+        self.assertEqual(self.index.search(u'  '), [])
+        self.assertEqual(len(self.index.search(u'v', limit=1)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+
+from django.test import TestCase
+
+from nmadb_registration import models as registration_models
+from nmadb_session_reg import models, testing
+
+
+def setup_module():
+    global DATABASES
+    DATABASES = testing.setup_databases()
+
+
+def teardown_module():
+    testing.teardown_databases(DATABASES)
+
+
+class TopSelectionTest(TestCase):
+    """ Tests, that top selections are computed per student, even if
+    students have the same name.
+    """
+
+    multi_db = True
+
+    def create_student(self, email):
+        """ Creates a student named Jonas Jonaitis.
+        """
+        base_info = models.BaseInfo.objects.create(
+                first_name=u'Jonas',
+                last_name=u'Jonaitis',
+                email=email,
+                section=self.section,
+                payment=0,
+                )
+        invitation = models.Invitation.objects.create(
+                base=base_info,
+                payment=0,
+                )
+        return models.StudentInfo.objects.create(
+                invitation=invitation,
+                first_name=u'Jonas',
+                last_name=u'Jonaitis',
+                email=email,
+                phone_number=u'+37060000000',
+                school_class=10,
+                school_year=2013,
+                school=self.school,
+                )
+
+    def setUp(self):
+        self.section = registration_models.Section.objects.create(
+                title=u'Fizika')
+        self.school = registration_models.School.objects.create(
+                title=u'Vilniaus lic\u0117jus')
+        self.first = self.create_student(u'jonas@example.com')
+        self.second = self.create_student(u'jonas2@example.com')
+        self.programs = [
+                models.SessionProgram.objects.create(
+                    title=u'Programa {0}'.format(index))
+                for index in range(3)]
+        # Ratings of namesakes interleave, when they are ordered by
+        # name and rating.
+        models.SessionProgramRating.objects.bulk_create([
+            models.SessionProgramRating(
+                student=student, program=self.programs[index],
+                rating=rating)
+            for student, index, rating in (
+                (self.first, 0, 5),
+                (self.second, 0, 4),
+                (self.first, 1, 3),
+                (self.second, 1, 2),
+                (self.first, 2, 1),
+                )])
+
+    def check_selections(self):
+        selections = dict(
+                (selection.student_id, selection)
+                for selection in models.TopSelection.objects.all())
+        self.assertEqual(
+                sorted(selections),
+                sorted([self.first.pk, self.second.pk]))
+        first = selections[self.first.pk]
+        self.assertEqual(
+                (first.first_program_id, first.first_rating,
+                 first.second_program_id, first.second_rating,
+                 first.third_program_id, first.third_rating),
+                (self.programs[0].pk, 5, self.programs[1].pk, 3,
+                 self.programs[2].pk, 1))
+        second = selections[self.second.pk]
+        self.assertEqual(
+                (second.first_program_id, second.first_rating,
+                 second.second_program_id, second.second_rating,
+                 second.third_program_id, second.third_rating),
+                (self.programs[0].pk, 4, self.programs[1].pk, 2,
+                 None, None))
+
+    def test_rebuild(self):
+        models.TopSelection.objects.rebuild()
+        self.check_selections()
+
+    def test_refresh(self):
+        models.TopSelection.objects.refresh(
+                [self.first.pk, self.second.pk])
+        self.check_selections()
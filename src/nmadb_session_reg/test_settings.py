@@ -0,0 +1,30 @@
+""" Settings for running tests of the application::
+
+    DJANGO_SETTINGS_MODULE=nmadb_session_reg.test_settings bin/test
+"""
+
+
+SECRET_KEY = 'nmadb-session-reg-tests'
+
+DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+            },
+        'session-reg': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+            },
+        }
+
+DATABASE_ROUTERS = ['nmadb_session_reg.testing.SyncingRouter']
+
+INSTALLED_APPS = (
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'nmadb_automation',
+        'nmadb_registration',
+        'nmadb_session_reg',
+        )
+
+NMADB_SESSION_REG_PROGRAM_BASED = True
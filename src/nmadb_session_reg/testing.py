@@ -0,0 +1,38 @@
+""" Helpers for tests, which need databases. Used together with
+:mod:`nmadb_session_reg.test_settings`.
+"""
+
+
+from nmadb_session_reg.router import (
+        SessionRegRouter, REGISTRATION_MODULES, DATABASE_NAME)
+
+
+class SyncingRouter(SessionRegRouter):
+    """ Router, which lets ``syncdb`` create tables of registration
+    modules in their database, so that test databases can be created.
+    """
+
+    def allow_syncdb(self, db, model):
+        """ Sync registration modules only to DATABASE_NAME and all
+        other applications only to the default database.
+        """
+        if model._meta.app_label in REGISTRATION_MODULES:
+            return db == DATABASE_NAME
+        return db == 'default'
+
+
+def setup_databases():
+    """ Creates test databases and returns state, which has to be
+    passed to :func:`teardown_databases`.
+    """
+    from django.test.runner import DiscoverRunner
+
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    return runner, runner.setup_databases()
+
+
+def teardown_databases(state):
+    """ Destroys test databases created by :func:`setup_databases`.
+    """
+    runner, old_config = state
+    runner.teardown_databases(old_config)
@@ -5,6 +5,10 @@ urlpatterns = patterns(
     'nmadb_session_reg.views',
     url(r'^base/import/$', 'import_base',
         name='nmadb-session-reg-import-base-info',),
+    url(r'^base/import/stream/$', 'import_base_stream',
+        name='nmadb-session-reg-import-base-info-stream',),
+    url(r'^schools/$', 'school_autocomplete',
+        name='nmadb-session-reg-school-autocomplete',),
     url(r'^section/import/$', 'import_sections',
         name='nmadb-registration-import-sections-and-groups',),
     url((
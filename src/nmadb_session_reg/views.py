@@ -1,27 +1,57 @@
+import json
+
+from django import http
 from django.db import transaction
 from django.contrib import admin
 from django import shortcuts
 from django.core import urlresolvers
+from django.core.cache import cache as fragment_cache
+from django.template import loader
+from django.utils import translation
+from django.utils.safestring import mark_safe
 from annoying.decorators import render_to
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext as _
 
 from nmadb_registration.conditions import check_condition
-from nmadb_registration.models import Section
 from nmadb_registration.forms import ImportTitleOnlyForm
-from nmadb_session_reg import models, forms
+from nmadb_session_reg import models, forms, importer, cache
 from nmadb_session_reg.config import info
 from nmadb_automation import mail
 from nmadb_automation import models as automation_models
 
 
+def _blank_form_content(base_info):
+    """ Returns markup of the blank registration form with initial
+    values of the invitee. The markup is cached per versions of the
+    session info and of the cached data forms are built from (program
+    catalog, session groups and school index) and per language.
+    """
+    key = u'nmadb-session-reg-blank-form-{0}-{1}-{2}-{3}-{4}'.format(
+            info.version,
+            cache.program_catalog.version(),
+            cache.session_groups.version(),
+            cache.school_index.version(),
+            translation.get_language())
+    content = fragment_cache.get(key)
+    if content is None:
+        form = forms.RegistrationFormSet(forms.BlankBaseInfo(), None)
+        content = loader.render_to_string(
+                'nmadb-session-reg/registration-form-content.html',
+                {'form': form, 'info': info})
+        fragment_cache.set(key, content)
+    return mark_safe(forms.BlankBaseInfo.fill(content, base_info))
+
+
 @render_to('nmadb-session-reg/registration.html')
 @transaction.atomic
 def register(request, uuid):
     """ Student registration view for session.
     """
 
-    invitation = shortcuts.get_object_or_404(models.Invitation, uuid=uuid)
+    invitation = shortcuts.get_object_or_404(
+            models.Invitation.objects.for_registration(), uuid=uuid)
     base_info = invitation.base
     try:
         student_info = invitation.student_info
@@ -69,6 +99,11 @@ def register(request, uuid):
                     'nmadb-session-reg-registration', uuid)
     else:
         form = forms.RegistrationFormSet(base_info, invitation)
+        return {
+                'info': info,
+                'form': form,
+                'form_content': _blank_form_content(base_info),
+                }
 
     return {
             'info': info,
@@ -76,29 +111,73 @@ def register(request, uuid):
             }
 
 
+def school_autocomplete(request):
+    """ Returns JSON list of schools matching the ``q`` parameter.
+    """
+    schools = cache.school_index.get().search(request.GET.get('q', u''))
+    return http.HttpResponse(
+            json.dumps([
+                {'id': pk, 'title': title}
+                for pk, title in schools]),
+            content_type='application/json')
+
+
+def _validator_cache_message(before):
+    """ Describes validator cache usage since ``before`` snapshot taken
+    with :func:`_validator_cache_counters`.
+    """
+    (name_hits, name_misses), (surname_hits, surname_misses) = [
+            (hits - old_hits, misses - old_misses)
+            for (hits, misses), (old_hits, old_misses) in zip(
+                _validator_cache_counters(), before)]
+    return _(
+            u'Name validator cache: {0} hits, {1} misses; surname '
+            u'validator cache: {2} hits, {3} misses.').format(
+                name_hits, name_misses, surname_hits, surname_misses)
+
+
+def _validator_cache_counters():
+    """ Returns name and surname validator cache counters.
+    """
+    return (
+            forms.NAME_VALIDATOR.counters(),
+            forms.SURNAME_VALIDATOR.counters(),
+            )
+
+
 @admin.site.admin_view
 @render_to('admin/file-form.html')
-@transaction.atomic
 def import_base(request):
     """ Imports base info.
     """
     if request.method == 'POST':
+        cache_counters = _validator_cache_counters()
         form = forms.ImportBaseInfoForm(request.POST, request.FILES)
         if form.is_valid():
+            rows = (
+                    row
+                    for sheet in form.cleaned_data['spreadsheet']
+                    for row in sheet)
+            if form.cleaned_data['upsert']:
+                upserter = importer.upsert_base_infos(rows)
+                timings = upserter.timings
+            else:
+                upserter = None
+                timings = importer.import_base_infos(rows)
             counter = 0
-            for sheet in form.cleaned_data['spreadsheet']:
-                for row in sheet:
-                    base_info = models.BaseInfo()
-                    for attr in row.keys():
-                        setattr(base_info, attr, row[attr])
-                    base_info.human_id = None
-                    base_info.comment = None
-                    base_info.generated_address = None
-                    base_info.save()
-                    counter += 1
-            msg = _(u'{0} base infos about students successfully imported.'
-                    ).format(counter)
+            for i, (count, seconds) in enumerate(timings):
+                counter += count
+                messages.info(
+                        request,
+                        _(u'Batch {0}: {1} rows written in {2:.3f} s.'
+                            ).format(i + 1, count, seconds))
+            if upserter is not None:
+                msg = upserter.summary()
+            else:
+                msg = _(u'{0} base infos about students successfully '
+                        u'imported.').format(counter)
             messages.success(request, msg)
+            messages.info(request, _validator_cache_message(cache_counters))
             return shortcuts.redirect(
                     'admin:nmadb_session_reg_baseinfo_changelist')
     else:
@@ -115,28 +194,81 @@ def import_base(request):
 
 @admin.site.admin_view
 @render_to('admin/file-form.html')
-@transaction.atomic
+def import_base_stream(request):
+    """ Imports base info from CSV file in committed chunks.
+    """
+    if request.method == 'POST':
+        form = forms.StreamImportBaseInfoForm(request.POST, request.FILES)
+        if form.is_valid():
+            cache_counters = _validator_cache_counters()
+            try:
+                result = importer.import_base_infos_streaming(
+                        importer.read_csv_rows(
+                            form.cleaned_data['csv_file'],
+                            forms.IMPORT_BASE_INFO_REQUIRED_COLUMNS),
+                        form.cleaned_data['batch_size'],
+                        form.cleaned_data['start_row'] or 0,
+                        form.cleaned_data['upsert'],
+                        processes=1)
+            except ValidationError as e:
+                for error in e.messages:
+                    messages.error(request, error)
+            else:
+                for number, error in result.errors:
+                    messages.error(
+                            request,
+                            _(u'Row {0}: {1}').format(number, error))
+                if result.upserter is not None:
+                    msg = result.upserter.summary()
+                else:
+                    msg = _(u'{0} base infos about students successfully '
+                            u'imported.').format(result.imported)
+                messages.info(
+                        request, _validator_cache_message(cache_counters))
+                if result.failed:
+                    messages.warning(request, msg)
+                    messages.error(
+                            request,
+                            _(u'Import stopped. Rows up to {0} are '
+                              u'committed; fix the file and import it '
+                              u'again starting after row {0}.'
+                              ).format(result.checkpoint))
+                else:
+                    messages.success(request, msg)
+                    return shortcuts.redirect(
+                            'admin:nmadb_session_reg_baseinfo_changelist')
+    else:
+        form = forms.StreamImportBaseInfoForm()
+    return {
+            'admin_index_url': urlresolvers.reverse('admin:index'),
+            'app_url': urlresolvers.reverse(
+                'admin:app_list',
+                kwargs={'app_label': 'nmadb_session_reg'}),
+            'app_label': _(u'NMADB Session Registration'),
+            'form': form,
+            }
+
+
+@admin.site.admin_view
+@render_to('admin/file-form.html')
 def import_sections(request):
     """ Imports sections and creates groups.
     """
     if request.method == 'POST':
         form = ImportTitleOnlyForm(request.POST, request.FILES)
         if form.is_valid():
-            counter = 0
-            for sheet in form.cleaned_data['spreadsheet']:
-                for row in sheet:
-                    section = Section()
-                    section.id = row[u'id']
-                    section.title = row[u'title']
-                    section.save()
-                    group = models.SessionGroup()
-                    group.id = row[u'id']
-                    group.title = row[u'title']
-                    group.save()
-                    counter += 1
-            msg = _(u'{0} sections successfully imported.').format(counter)
-            msg = _(u'{0} groups successfully created.').format(counter)
-            messages.success(request, msg)
+            sections, groups = importer.import_sections_and_groups(
+                    row
+                    for sheet in form.cleaned_data['spreadsheet']
+                    for row in sheet)
+            messages.success(
+                    request,
+                    _(u'Sections: {0} created, {1} renamed, {2} '
+                      u'unchanged.').format(*sections))
+            messages.success(
+                    request,
+                    _(u'Groups: {0} created, {1} renamed, {2} '
+                      u'unchanged.').format(*groups))
             return shortcuts.redirect(
                     'admin:nmadb_registration_section_changelist')
     else: